@@ -0,0 +1,65 @@
+"""
+Export a user's full credit ledger to a file or stdout.
+
+Usage:
+    python -m accessai.cli.export_ledger (--user-id UUID | --email EMAIL)
+        [--format ndjson|csv] [--gzip] [--chunk-size N] [-o FILE]
+
+Rows are streamed through a server-side cursor and written chunk by chunk,
+so memory use stays flat regardless of ledger size. Months already compacted
+into daily rollups (older than LEDGER_RETENTION_MONTHS) are not exported.
+"""
+
+import argparse
+import asyncio
+import sys
+from sqlalchemy import select
+from ..database import engine, async_session
+from ..models.user import User
+from ..services.export import EXPORT_FORMATS, export_transactions
+
+
+async def resolve_user_id(email: str) -> str | None:
+    async with async_session() as db:
+        result = await db.execute(select(User.id).where(User.email == email))
+        user_id = result.scalar_one_or_none()
+        return str(user_id) if user_id else None
+
+
+async def run(args) -> int:
+    try:
+        user_id = args.user_id or await resolve_user_id(args.email)
+        if not user_id:
+            print(f"User not found for email: {args.email}", file=sys.stderr)
+            return 1
+
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            async for chunk in export_transactions(
+                user_id, fmt=args.format, gzip=args.gzip, chunk_size=args.chunk_size
+            ):
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+    finally:
+        await engine.dispose()
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m accessai.cli.export_ledger", description="Export a user's credit ledger")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user-id", help="User UUID")
+    who.add_argument("--email", help="User email address")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows fetched per round trip")
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
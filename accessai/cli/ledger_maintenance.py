@@ -0,0 +1,67 @@
+"""
+Credit ledger partition maintenance. Meant to run from cron (daily is plenty).
+Inserts fail once the ledger outgrows its last monthly partition.
+`python -m accessai.migrations upgrade` also creates the upcoming partitions
+on every deploy; this cron job covers the time between deploys and runs the
+rollup and reconcile commands. For example:
+
+    15 3 * * *  python -m accessai.cli.ledger_maintenance all
+
+Usage:
+    python -m accessai.cli.ledger_maintenance partitions [--ahead N]
+    python -m accessai.cli.ledger_maintenance rollup [--retention-months N]
+    python -m accessai.cli.ledger_maintenance reconcile
+    python -m accessai.cli.ledger_maintenance all
+"""
+
+import argparse
+import asyncio
+import sys
+from ..config import settings
+from ..database import engine, async_session
+from ..services.ledger_maintenance import ensure_partitions, rollup_old_partitions, find_unreconciled
+
+
+async def run(args) -> int:
+    status = 0
+    try:
+        if args.command in ("partitions", "all"):
+            created = await ensure_partitions(engine, months_ahead=args.ahead)
+            for name in created:
+                print(f"Created partition {name}")
+            if not created:
+                print("All partitions already exist")
+
+        if args.command in ("rollup", "all"):
+            compacted = await rollup_old_partitions(engine, retention_months=args.retention_months)
+            for name, rows in compacted:
+                print(f"Compacted {rows} rows from {name} into daily rollups")
+            if not compacted:
+                print("No partitions older than the retention window")
+
+        if args.command in ("reconcile", "all"):
+            async with async_session() as db:
+                mismatches = await find_unreconciled(db)
+            for user_id, balance, ledger_total in mismatches:
+                print(f"User {user_id}: balance {balance}, ledger {ledger_total}")
+            if mismatches:
+                status = 1
+            else:
+                print("All balances reconcile with the ledger")
+    finally:
+        await engine.dispose()
+
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m accessai.cli.ledger_maintenance", description="Credit ledger partition maintenance")
+    parser.add_argument("command", choices=["partitions", "rollup", "reconcile", "all"])
+    parser.add_argument("--ahead", type=int, default=settings.LEDGER_PARTITIONS_AHEAD, help="Future monthly partitions to create")
+    parser.add_argument("--retention-months", type=int, default=settings.LEDGER_RETENTION_MONTHS, help="Months of raw rows to keep")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Replay an export of Stripe events offline, straight into the database.
+Applies checkout.session.completed events that are not yet in payments,
+in bulk, and writes a reconciliation report. Safe to run more than once:
+sessions already recorded are skipped.
+
+Usage:
+    python -m accessai.cli.replay_stripe_events EVENTS.jsonl
+        [--verify-signatures] [--workers N] [--batch-size N]
+        [--report FILE] [--dry-run]
+
+Each line is a Stripe event object, or a captured delivery
+{"payload": "<raw body>", "signature": "<Stripe-Signature header>"}.
+--verify-signatures checks captured deliveries against STRIPE_WEBHOOK_SECRET
+in a process pool and drops events that fail. --dry-run runs every
+statement and rolls it back, so the report shows what would be applied.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from ..config import settings
+from ..database import engine, async_session
+from ..services.stripe_replay import (
+    ReplayReport, parse_line, verify_signature, checkout_grant, recorded_sessions, apply_grants
+)
+
+
+def read_events(path: str, report: ReplayReport) -> list[tuple[int, dict, str | None, str | None]]:
+    events = []
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            report.lines += 1
+            try:
+                events.append((number, *parse_line(line)))
+            except (ValueError, TypeError):
+                report.invalid.append(number)
+    return events
+
+
+def check_signatures(events: list, workers: int, report: ReplayReport) -> list:
+    jobs = [(payload, signature, settings.STRIPE_WEBHOOK_SECRET) for _, _, payload, signature in events]
+    with ProcessPoolExecutor(workers) as pool:
+        valid = list(pool.map(verify_signature, jobs, chunksize=256))
+
+    kept = []
+    for event, ok in zip(events, valid):
+        if ok:
+            kept.append(event)
+        else:
+            report.bad_signature.append(event[0])
+    return kept
+
+
+async def run(args) -> int:
+    report = ReplayReport(dry_run=args.dry_run)
+
+    events = read_events(args.events, report)
+    if args.verify_signatures:
+        events = check_signatures(events, args.workers, report)
+
+    # Extract grants, keeping the first delivery of each session
+    grants = {}
+    for number, event, _, _ in events:
+        try:
+            grant = checkout_grant(event)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            report.invalid.append(number)
+            continue
+        if grant is None:
+            report.skipped_type += 1
+        elif grant.session_id in grants:
+            report.duplicate_in_file += 1
+        else:
+            grants[grant.session_id] = grant
+    pending = list(grants.values())
+
+    try:
+        for start in range(0, len(pending), args.batch_size):
+            batch = pending[start:start + args.batch_size]
+            async with async_session() as db:
+                recorded = await recorded_sessions(db, [g.session_id for g in batch])
+                batch = [g for g in batch if g.session_id not in recorded]
+                report.already_recorded += len(recorded)
+                if not batch:
+                    continue
+
+                resolved, applied = await apply_grants(db, batch)
+                if args.dry_run:
+                    await db.rollback()
+                else:
+                    await db.commit()
+
+            for grant in batch:
+                if grant.session_id in applied:
+                    report.applied += 1
+                    report.credits_granted += grant.credits
+                elif grant.session_id not in resolved:
+                    report.unknown_user.append(grant.session_id)
+                else:
+                    # Recorded by the live webhook since the lookup above
+                    report.already_recorded += 1
+            print(f"Processed {min(start + args.batch_size, len(pending))}/{len(pending)} sessions", file=sys.stderr)
+    finally:
+        await engine.dispose()
+
+    summary = report.to_dict()
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}Lines read:          {report.lines}")
+    print(f"{prefix}Invalid:             {len(report.invalid)}")
+    print(f"{prefix}Bad signature:       {len(report.bad_signature)}")
+    print(f"{prefix}Other event types:   {report.skipped_type}")
+    print(f"{prefix}Duplicates in file:  {report.duplicate_in_file}")
+    print(f"{prefix}Already recorded:    {report.already_recorded}")
+    print(f"{prefix}Applied:             {report.applied} ({report.credits_granted} credits)")
+    print(f"{prefix}Unknown user:        {len(report.unknown_user)}")
+
+    return 1 if report.unknown_user or report.bad_signature or report.invalid else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m accessai.cli.replay_stripe_events", description="Replay exported Stripe events into the database")
+    parser.add_argument("events", help="JSONL file of Stripe events")
+    parser.add_argument("--verify-signatures", action="store_true", help="Check captured deliveries against STRIPE_WEBHOOK_SECRET")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for signature checks (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Sessions applied per statement")
+    parser.add_argument("--report", help="Write the reconciliation report as JSON to this file")
+    parser.add_argument("--dry-run", action="store_true", help="Roll back instead of committing")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
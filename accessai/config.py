@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Dict
+from typing import Dict, Literal
 
 
 class Settings(BaseSettings):
@@ -15,6 +15,124 @@ class Settings(BaseSettings):
     STRIPE_WEBHOOK_SECRET: str = ""
     SENTRY_DSN: str = ""
 
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1  # seconds, -1 keeps connections forever
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
+
+    # Credit ledger writer: "sync" writes each transaction on the request path,
+    # "group" batches writes and waits for the flush, "async" returns at once.
+    # Only sync mode commits the balance and its ledger row together. The
+    # buffered modes commit the balance first, so a crash can lose the batch
+    # being collected (group) or up to LEDGER_MAX_QUEUE rows (async), and they
+    # never fail the request on a flush error: a batch is retried
+    # LEDGER_FLUSH_ATTEMPTS times, then its rows are logged
+    # (ledger_row_unwritten) and counted in
+    # accessai_ledger_rows_unwritten_total for reconciliation
+    LEDGER_WRITE_MODE: Literal["sync", "group", "async"] = "sync"
+    LEDGER_BATCH_SIZE: int = 500
+    LEDGER_FLUSH_INTERVAL_MS: int = 20
+    LEDGER_MAX_QUEUE: int = 10000
+    LEDGER_FLUSH_ATTEMPTS: int = 3
+
+    # Ledger partition maintenance: months of raw rows kept before compaction
+    # into daily rollups, and monthly partitions created ahead of time
+    LEDGER_RETENTION_MONTHS: int = 12
+    LEDGER_PARTITIONS_AHEAD: int = 2
+    # How often the health prober checks next month's partition exists (the
+    # app never creates partitions: migrations and the maintenance CLI do)
+    LEDGER_PARTITION_CHECK_INTERVAL_SECONDS: int = 3600
+
+    # Rate limit storage: "memory" (per worker), "shm" (shared by workers on
+    # one host) or "redis" (shared by every host; needs the redis package)
+    RATE_LIMIT_STORAGE: Literal["memory", "shm", "redis"] = "shm"
+    RATE_LIMIT_SHM_PATH: str = ""  # defaults to /dev/shm/accessai-ratelimit
+    RATE_LIMIT_SHM_SLOTS: int = 65536
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # In-process cache of authenticated users (size 0 disables it)
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # Transaction history pagination
+    HISTORY_PAGE_SIZE: int = 20
+    HISTORY_MAX_PAGE_SIZE: int = 100
+
+    # Cache of verified JWT payloads (entries never outlive the token's exp)
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+
+    # Credit holds (jobs and batches): unclaimed holds are returned to the
+    # balance after the TTL. Job holds add the job's expected wait and run time
+    CREDIT_HOLD_TTL_SECONDS: int = 300
+    CREDIT_HOLD_SWEEP_INTERVAL_SECONDS: int = 30
+
+    # Largest batch accepted by the /credits/*/batch routes
+    BATCH_MAX_ITEMS: int = 100
+
+    # AI result cache. Set RESULT_CACHE_REDIS_URL to share results between
+    # workers; cache hits cost RESULT_CACHE_HIT_COST_PERCENT of the normal
+    # price (100 = full price, 0 = free)
+    RESULT_CACHE_SIZE: int = 10000
+    RESULT_CACHE_TTL_SECONDS: int = 86400
+    RESULT_CACHE_REDIS_URL: str = ""
+    RESULT_CACHE_HIT_COST_PERCENT: int = 100
+
+    # AI job queue: worker processes, queued jobs before 503, and how long
+    # finished jobs stay available for polling
+    JOB_WORKERS: int = 2
+    JOB_QUEUE_SIZE: int = 1000
+    JOB_RESULT_TTL_SECONDS: int = 600
+
+    # Micro-batching of concurrent single-item AI calls: a batch is sent to
+    # the model after MAX_WAIT_MS or once it holds MAX_SIZE items
+    INFERENCE_BATCH_MAX_SIZE: int = 32
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 5
+
+    # Stripe API client: retries (with jittered backoff) on network errors
+    # and 5xx/429, and a circuit breaker that fails fast for RESET_SECONDS
+    # after FAILURE_THRESHOLD consecutive failures. STRIPE_API_BASE can point
+    # at a local stub (python -m benchmarks.stripe_stub)
+    STRIPE_API_BASE: str = "https://api.stripe.com"
+    STRIPE_TIMEOUT_SECONDS: float = 10
+    STRIPE_MAX_CONNECTIONS: int = 20
+    STRIPE_MAX_RETRIES: int = 2
+    STRIPE_BREAKER_FAILURE_THRESHOLD: int = 5
+    STRIPE_BREAKER_RESET_SECONDS: float = 30
+
+    # Background dependency checks behind /health and /readyz
+    HEALTH_DB_INTERVAL_SECONDS: float = 5
+    HEALTH_STRIPE_INTERVAL_SECONDS: float = 60
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
+
+    # Request logging: lines are written by a background thread from a
+    # bounded queue (dropped when full); 2xx responses are logged with this
+    # probability, errors always
+    REQUEST_LOG_MAX_QUEUE: int = 10000
+    REQUEST_LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+
+    # Google OpenID discovery document and signing keys: refreshed in the
+    # background at most this often (sooner if Google's max-age is shorter)
+    OIDC_METADATA_TTL_SECONDS: int = 3600
+    OIDC_METADATA_RETRY_SECONDS: int = 30
+
+    # Fast startup for autoscaled containers: serve as soon as the process
+    # is up, checking the schema version through /readyz instead of before
+    # startup, and loading OIDC metadata and Stripe prices on first use
+    FAST_STARTUP: bool = False
+
+    # Warn (and count in accessai_db_query_threshold_exceeded_total) when one
+    # request runs more SQL statements than this; 0 disables the check
+    DB_QUERY_WARN_THRESHOLD: int = 20
+
+    # Sentry tracing: each route is traced at full rate up to this many
+    # transactions per minute, then at SENTRY_TRACES_MIN_SAMPLE_RATE
+    SENTRY_TRACES_PER_ROUTE_PER_MINUTE: float = 60
+    SENTRY_TRACES_MIN_SAMPLE_RATE: float = 0.01
+
     class Config:
         env_file = ".env"
 
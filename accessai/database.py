@@ -1,11 +1,170 @@
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings # Import the settings object
 
+# Connection pool metrics, exported on /metrics
+POOL_WAIT_SECONDS = Histogram(
+    "accessai_db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+POOL_TIMEOUTS = Counter(
+    "accessai_db_pool_timeouts_total",
+    "Connection checkouts that gave up after DB_POOL_TIMEOUT"
+)
+POOL_CHECKED_OUT = Gauge(
+    "accessai_db_pool_checked_out",
+    "Connections currently checked out of the pool"
+)
+POOL_OVERFLOW = Gauge(
+    "accessai_db_pool_overflow",
+    "Connections open beyond DB_POOL_SIZE (negative while the pool is still filling)"
+)
+POOL_SIZE = Gauge(
+    "accessai_db_pool_size",
+    "Configured number of persistent connections in the pool"
+)
+
+
+# Query metrics per route template, exported on /metrics
+DB_QUERIES_PER_REQUEST = Histogram(
+    "accessai_db_queries_per_request",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "accessai_db_statement_seconds",
+    "Execution time of each SQL statement, by the route that issued it",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "accessai_db_time_per_request_seconds",
+    "Total SQL execution time per request",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+DB_QUERY_THRESHOLD_EXCEEDED = Counter(
+    "accessai_db_query_threshold_exceeded_total",
+    "Requests that ran more than DB_QUERY_WARN_THRESHOLD statements (likely N+1)",
+    ["route"]
+)
+
+logger = structlog.get_logger()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long each checkout waited
+    and how many checkouts timed out.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+# asyncpg-only options are passed through connect_args
+connect_args = {}
+if make_url(settings.DATABASE_URL).drivername.endswith("asyncpg"):
+    connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
 # The DATABASE_URL is now read from the settings object
-engine = create_async_engine(settings.DATABASE_URL, echo=False) # Turned echo off for cleaner logs
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False, # Turned echo off for cleaner logs
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=connect_args,
+)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Pool gauges are read at scrape time
+POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout())
+POOL_OVERFLOW.set_function(lambda: engine.pool.overflow())
+POOL_SIZE.set_function(lambda: engine.pool.size())
+
+
+
+class QueryStats:
+    """SQL statements run while serving one request."""
+
+    __slots__ = ("durations", "statements")
+
+    def __init__(self):
+        self.durations: list[float] = []
+        self.statements: StatementCounter = StatementCounter()
+
+    def record(self, statement: str, seconds: float):
+        self.durations.append(seconds)
+        self.statements[statement] += 1
+
+
+# Stats of the request being served; None outside requests
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = current_query_stats.get()
+    if stats is None:
+        DB_STATEMENT_SECONDS.labels("background").observe(elapsed)
+    else:
+        stats.record(statement, elapsed)
+
+
+def record_query_stats(route: str, stats: QueryStats):
+    """
+    Export a finished request's statements under its route template, and
+    warn when it ran more than DB_QUERY_WARN_THRESHOLD of them: a request
+    repeating one statement many times is usually an N+1 loop.
+    """
+    count = len(stats.durations)
+    DB_QUERIES_PER_REQUEST.labels(route).observe(count)
+    if not count:
+        return
+    statement_seconds = DB_STATEMENT_SECONDS.labels(route)
+    for seconds in stats.durations:
+        statement_seconds.observe(seconds)
+    DB_TIME_PER_REQUEST.labels(route).observe(sum(stats.durations))
+
+    if settings.DB_QUERY_WARN_THRESHOLD and count > settings.DB_QUERY_WARN_THRESHOLD:
+        DB_QUERY_THRESHOLD_EXCEEDED.labels(route).inc()
+        statement, repeats = stats.statements.most_common(1)[0]
+        logger.warning(
+            "Too many queries in one request",
+            route=route,
+            queries=count,
+            most_repeated=" ".join(statement.split())[:200],
+            repeats=repeats
+        )
+
+
 Base = declarative_base()
 
 async def get_db() -> AsyncSession:
@@ -2,12 +2,21 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from ..config import settings
 from ..database import get_db
 from ..models.user import User
+from ..services.cache import TTLCache
 from ..services.jwt import verify_token
 
 security = HTTPBearer()
 
+# Authenticated users keyed by the token's "sub" claim
+user_cache = TTLCache(
+    "user",
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -18,7 +27,7 @@ async def get_current_user(
     
     - Reads Bearer token from Authorization header
     - Validates token signature and expiration
-    - Queries user from database
+    - Returns the cached user, or queries it from the database
     - Returns 401 if invalid or missing
     """
     token = credentials.credentials
@@ -40,6 +49,11 @@ async def get_current_user(
             detail="Invalid token payload",
         )
     
+    # Serve from cache when possible
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
     # Query user from database
     stmt = select(User).where(User.id == user_id)
     result = await db.execute(stmt)
@@ -51,4 +65,8 @@ async def get_current_user(
             detail="User not found",
         )
     
+    # Cache a detached copy, so a commit or rollback in this request's
+    # session cannot expire it under later requests
+    db.expunge(user)
+    user_cache.set(user_id, user)
     return user
@@ -0,0 +1,33 @@
+import math
+from fastapi import Depends, HTTPException, Request, status
+from ..models.user import User
+from ..services.rate_limit import parse_limit, rate_limiter
+from .auth import get_current_user
+
+
+class RateLimit:
+    """
+    Per-user rate limit for a route, enforced with a token bucket in the
+    shared rate-limit storage.
+
+    Usage:
+        @router.post("/summarize", dependencies=[Depends(RateLimit("20/minute"))])
+
+    Buckets are keyed on the route path and the authenticated user's id, so
+    users behind the same NAT do not share a bucket and every worker sees
+    the same count. Returns 429 with Retry-After when the bucket is empty.
+    """
+
+    def __init__(self, limit: str):
+        self.limit = parse_limit(limit)
+
+    async def __call__(self, request: Request, current_user: User = Depends(get_current_user)):
+        key = f"{request.scope['route'].path}:{current_user.id}"
+        allowed, retry_after = await rate_limiter.hit(key, self.limit)
+
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: {self.limit.text}",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
@@ -1,17 +1,12 @@
+import asyncio
 import time
 import structlog
-import stripe
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Depends
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
-from .database import engine, Base, get_db
+from .database import engine
+from .migrations import verify_schema
 from .models import user  # Ensure the User model is imported
 from .models import credit  # Ensure the Credit models are imported
 from .models import payment  # Ensure the Payment model is imported
@@ -19,7 +14,18 @@ from .routes import auth  # Import auth routes
 from .routes import users  # Import users routes
 from .routes import credits  # Import credits routes
 from .routes import payments  # Import payments routes
-from .config import settings
+from .routes import jobs  # Import AI job routes
+from .services.credit import run_hold_sweeper
+from .services.jobs import job_queue
+from .services.ledger import ledger_writer
+from .services.rate_limit import rate_limiter
+from .services.result_cache import result_cache
+from .services.stripe_gateway import stripe_gateway
+from .services.health import health_prober, pool_status, schema_check
+from .services.oauth import google_metadata
+from .middleware import RequestMiddleware, PathSessionMiddleware
+from .services.request_log import request_log_writer
+from .config import settings, Settings
 
 # Configure structlog for structured JSON logging
 structlog.configure(
@@ -34,153 +40,186 @@ logger = structlog.get_logger()
 # Store startup time for uptime calculation
 start_time = time.time()
 
-# Initialize Prometheus metrics
-from prometheus_fastapi_instrumentator import Instrumentator
 
-instrumentator = Instrumentator(
-    should_group_status_codes=False,
-    should_ignore_untemplated=True,
-    excluded_handlers=["/health", "/metrics"]
-)
-
-# Initialize Sentry if DSN is provided
-if settings.SENTRY_DSN:
-    import sentry_sdk
-    from sentry_sdk.integrations.fastapi import FastApiIntegration
-    
-    sentry_sdk.init(
-        dsn=settings.SENTRY_DSN,
-        integrations=[FastApiIntegration()],
-        traces_sample_rate=1.0
-    )
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def create_app(app_settings: Settings = settings) -> FastAPI:
     """
-    Lifespan context manager for startup and shutdown events.
-    """
-    logger.info("AccessAI server starting up...")
-    # Create database tables on startup
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created successfully")
-    yield
-    logger.info("AccessAI server shutting down...")
-
-
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
-app = FastAPI(title="AccessAI", lifespan=lifespan)
-
-# Add rate limiter to app state
-app.state.limiter = limiter
-
-# Add rate limit exception handler
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# Add Prometheus metrics
-instrumentator.instrument(app).expose(app)
-
-# Add SessionMiddleware for OAuth (required by authlib)
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
-
-# Add CORS middleware (allow specific origins)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:8080"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    Build the FastAPI application.
 
-# Include auth routes
-app.include_router(auth.router)
+    Optional subsystems are only imported when configured (Sentry) or on
+    first use (authlib on the first login, the stripe SDK on the first
+    webhook). With FAST_STARTUP the lifespan does no network work before
+    serving: the schema version is checked by the readiness probe instead
+    of blocking startup, and Google's OIDC metadata and Stripe prices are
+    loaded on first use.
 
-# Include users routes
-app.include_router(users.router)
-
-# Include credits routes
-app.include_router(credits.router)
-
-# Include payments routes
-app.include_router(payments.router)
+    Args:
+        app_settings: Settings for the app itself (middleware, Sentry,
+            startup mode); services read accessai.config.settings
 
+    Returns:
+        The application, ready to serve
+    """
+    # Initialize Sentry if DSN is provided
+    if app_settings.SENTRY_DSN:
+        import sentry_sdk
+        from sentry_sdk.integrations.fastapi import FastApiIntegration
+        from .services.tracing import AdaptiveTraceSampler
+
+        # Full tracing per route up to a budget, then a low floor rate
+        trace_sampler = AdaptiveTraceSampler(
+            per_minute=app_settings.SENTRY_TRACES_PER_ROUTE_PER_MINUTE,
+            floor=app_settings.SENTRY_TRACES_MIN_SAMPLE_RATE
+        )
+        sentry_sdk.init(
+            dsn=app_settings.SENTRY_DSN,
+            integrations=[FastApiIntegration()],
+            traces_sampler=trace_sampler
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """
+        Lifespan context manager for startup and shutdown events.
+        """
+        logger.info("AccessAI server starting up...", fast_startup=app_settings.FAST_STARTUP)
+        # Migrations run separately (python -m accessai.migrations upgrade);
+        # the app only checks the recorded schema version
+        if app_settings.FAST_STARTUP:
+            # Don't wait for the database: not ready until the check passes
+            health_prober.add(schema_check())
+        else:
+            await verify_schema(engine)
+            logger.info("Database schema version verified")
+        # Probe the database and Stripe in the background for the health endpoints
+        health_prober.start()
+        # Start the write-behind ledger writer (no-op in sync mode)
+        ledger_writer.start()
+        # Return credits of holds whose jobs never finished
+        hold_sweeper = asyncio.create_task(run_hold_sweeper(app_settings.CREDIT_HOLD_SWEEP_INTERVAL_SECONDS))
+        # Start the AI job worker pool (processes are spawned on the first job)
+        job_queue.start()
+        price_warmup = None
+        if not app_settings.FAST_STARTUP:
+            # Look up checkout prices in the background; startup doesn't wait on Stripe
+            if stripe_gateway.configured:
+                price_warmup = asyncio.create_task(stripe_gateway.warm_prices())
+            # Prefetch Google's discovery document and signing keys, then keep them fresh
+            google_metadata.start()
+        yield
+        logger.info("AccessAI server shutting down...")
+        # Release holds of queued jobs before the ledger writer stops
+        await job_queue.stop()
+        await health_prober.stop()
+        await google_metadata.stop()
+        hold_sweeper.cancel()
+        if price_warmup is not None:
+            price_warmup.cancel()
+        # Flush buffered ledger rows before the process exits
+        await ledger_writer.stop()
+        await rate_limiter.close()
+        await result_cache.close()
+        await stripe_gateway.close()
+        request_log_writer.stop()
+
+    app = FastAPI(title="AccessAI", lifespan=lifespan)
+    if app_settings.SENTRY_DSN:
+        trace_sampler.app = app
+
+    # Add Prometheus metrics
+    from prometheus_fastapi_instrumentator import Instrumentator
+
+    Instrumentator(
+        should_group_status_codes=False,
+        should_ignore_untemplated=True,
+        excluded_handlers=["/health", "/livez", "/readyz", "/metrics"]
+    ).instrument(app).expose(app)
+
+    # Add SessionMiddleware for OAuth (required by authlib), on /auth only
+    app.add_middleware(PathSessionMiddleware, prefix="/auth", secret_key=app_settings.SECRET_KEY)
+
+    # Add CORS middleware (allow specific origins)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://localhost:8080"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-# Logging middleware - logs every HTTP request
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    # Security headers and request logging, outermost so every response gets them
+    app.add_middleware(RequestMiddleware, log_writer=request_log_writer)
 
-    # Log incoming request
-    logger.info(
-        "request",
-        method=request.method,
-        path=request.url.path
-    )
+    # Include auth routes
+    app.include_router(auth.router)
 
-    # Process the request
-    response = await call_next(request)
+    # Include users routes
+    app.include_router(users.router)
 
-    # Calculate duration in milliseconds
-    duration = (time.time() - start_time) * 1000
+    # Include credits routes
+    app.include_router(credits.router)
 
-    # Log response details
-    logger.info(
-        "response",
-        method=request.method,
-        path=request.url.path,
-        status=response.status_code,
-        duration_ms=round(duration, 2)
-    )
+    # Include payments routes
+    app.include_router(payments.router)
 
-    return response
+    # Include AI job routes
+    app.include_router(jobs.router)
 
+    # Health endpoints
+    app.add_api_route("/health", health_check, methods=["GET"], tags=["Health"])
+    app.add_api_route("/livez", liveness, methods=["GET"], tags=["Health"])
+    app.add_api_route("/readyz", readiness, methods=["GET"], tags=["Health"])
 
-# Security headers middleware
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    
-    # Security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-Content-Type-Options"] = "deny"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    
-    return response
+    return app
 
 
-@app.get("/health", tags=["Health"])
-async def health_check(db_session: AsyncSession = Depends(get_db)):
+async def health_check():
     """
-    Enhanced health check with database and Stripe verification.
+    Health check with database and Stripe status.
     Returns the server status, database status, Stripe status, and uptime.
+    Served from the background prober's latest results. A dependency not
+    probed yet (just after startup) reports "unknown" and doesn't fail the
+    check; /readyz is what waits for the first probe.
     """
-    status = {"status": "ok", "database": "ok", "stripe": "ok", "uptime_seconds": int(time.time() - start_time)}
-    is_healthy = True
+    dependencies = health_prober.report()
+    database = dependencies["database"]["status"]
+    status = {
+        "status": "ok",
+        "database": database if database in ("ok", "unknown") else "error",
+        "stripe": "ok",
+        "uptime_seconds": int(time.time() - start_time)
+    }
+    if "stripe" in dependencies and dependencies["stripe"]["status"] not in ("ok", "unknown"):
+        status["stripe"] = "warning"
     
-    # Check database
-    try:
-        await db_session.execute(text("SELECT 1"))
-    except Exception as e:
-        status["database"] = "error"
-        is_healthy = False
-    
-    # Check Stripe (if key is set)
-    if settings.STRIPE_SECRET_KEY:
-        try:
-            stripe.api_key = settings.STRIPE_SECRET_KEY
-            stripe.Account.retrieve()
-        except Exception:
-            status["stripe"] = "warning"
-    
-    if not is_healthy:
+    if status["database"] == "error":
         status["status"] = "degraded"
-        from fastapi.responses import JSONResponse
         return JSONResponse(status_code=503, content=status)
     
     return status
 
+
+async def liveness():
+    """Liveness probe: the process is up and serving. Never touches a dependency."""
+    return {"status": "ok", "uptime_seconds": int(time.time() - start_time)}
+
+
+async def readiness():
+    """
+    Readiness probe: 503 until every required dependency passed its latest
+    background check. Reports each dependency's latency and the connection
+    pool's saturation.
+    """
+    ready = health_prober.ready()
+    content = {
+        "status": "ready" if ready else "not_ready",
+        "dependencies": health_prober.report(),
+        "pool": pool_status()
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
+# Module-level app for `uvicorn accessai.main:app`
+# (or `uvicorn accessai.main:create_app --factory`)
+app = create_app()
+
 #Commit added to test ci
\ No newline at end of file
@@ -0,0 +1,75 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .database import QueryStats, current_query_stats, record_query_stats
+from .services.request_log import RequestLogWriter
+
+# Added to every HTTP response
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
+
+
+class RequestMiddleware:
+    """
+    Pure ASGI middleware that adds the security headers and logs each
+    request with its status and duration, in one pass over the response.
+    It also collects the SQL statements the request runs and exports them
+    under the matched route template.
+    Unlike @app.middleware("http") it doesn't wrap the request and response
+    in extra objects or run the endpoint in a separate task.
+    """
+
+    def __init__(self, app: ASGIApp, log_writer: RequestLogWriter):
+        self.app = app
+        self.log_writer = log_writer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+
+        async def send_with_headers(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.log_writer.log(scope["method"], scope["path"], status, round(duration, 2))
+            current_query_stats.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            record_query_stats(route.path if route is not None else "unmatched", query_stats)
+
+
+class PathSessionMiddleware:
+    """
+    SessionMiddleware for one path prefix only. The OAuth flow is the only
+    user of sessions, so other routes skip cookie parsing and signing.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str, **session_options):
+        self.app = app
+        self.prefix = prefix
+        self.session_app = SessionMiddleware(app, path=prefix, **session_options)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket") and scope["path"].startswith(self.prefix):
+            await self.session_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
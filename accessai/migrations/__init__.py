@@ -0,0 +1,153 @@
+"""
+Versioned schema migrations.
+
+Each module in migrations/versions is named vNNNN_<slug>.py and defines a
+DESCRIPTION and a list of SQL STATEMENTS. Applied versions are recorded in
+the schema_migrations table. Migrations are applied with the CLI
+(python -m accessai.migrations upgrade), never at app startup; the app only
+checks that the database is at the expected version.
+"""
+
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+from . import versions
+
+# Arbitrary key so that only one migration runner works at a time
+ADVISORY_LOCK_KEY = 720_431_977
+
+
+class SchemaVersionError(Exception):
+    """Raised when the database schema is not at the version the code expects."""
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    description: str
+    statements: list
+
+
+def load_migrations() -> list[Migration]:
+    """
+    Discover the migration modules in version order.
+
+    Returns:
+        List of Migration objects sorted by version
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        name = module_info.name
+        if not name.startswith("v"):
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{name}")
+        version = int(name[1:].split("_", 1)[0])
+        migrations.append(Migration(version, name, module.DESCRIPTION, module.STATEMENTS))
+
+    migrations.sort(key=lambda m: m.version)
+    for expected, migration in enumerate(migrations, start=1):
+        if migration.version != expected:
+            raise SchemaVersionError(f"Migration versions must be contiguous; missing v{expected:04d}")
+    return migrations
+
+
+MIGRATIONS = load_migrations()
+
+# Version the current code expects the database to be at
+HEAD_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+async def _ensure_version_table(conn: AsyncConnection):
+    await conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+        """
+    ))
+
+
+async def _current_version(conn: AsyncConnection) -> int:
+    result = await conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))
+    return result.scalar_one()
+
+
+async def current_version(engine: AsyncEngine) -> int | None:
+    """
+    Get the schema version recorded in the database.
+
+    Returns:
+        The highest applied version, or None if migrations were never run
+    """
+    async with engine.connect() as conn:
+        exists = await conn.scalar(text("SELECT to_regclass('schema_migrations') IS NOT NULL"))
+        if not exists:
+            return None
+        return await _current_version(conn)
+
+
+async def upgrade(engine: AsyncEngine, target: int | None = None, echo=print) -> list[Migration]:
+    """
+    Apply pending migrations, each in its own transaction.
+
+    Args:
+        engine: Database engine
+        target: Version to stop at (defaults to HEAD_VERSION)
+        echo: Callable used to report progress
+
+    Returns:
+        List of migrations that were applied
+    """
+    target = HEAD_VERSION if target is None else target
+    applied = []
+
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+
+        async with engine.begin() as conn:
+            # Serialize concurrent runners; the lock is released on commit
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            await _ensure_version_table(conn)
+            if migration.version <= await _current_version(conn):
+                continue
+
+            echo(f"Applying v{migration.version:04d}: {migration.description}")
+            for statement in migration.statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": migration.version, "description": migration.description},
+            )
+            applied.append(migration)
+
+    return applied
+
+
+async def verify_schema(engine: AsyncEngine):
+    """
+    Check that the database is at HEAD_VERSION without running any DDL.
+
+    Raises:
+        SchemaVersionError: If migrations are missing or the database is ahead of the code
+    """
+    version = await current_version(engine)
+    if version is None:
+        raise SchemaVersionError(
+            "Database has no schema_migrations table. Run: python -m accessai.migrations upgrade"
+        )
+    if version < HEAD_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at v{version:04d}, code expects v{HEAD_VERSION:04d}. "
+            "Run: python -m accessai.migrations upgrade"
+        )
+    if version > HEAD_VERSION:
+        raise SchemaVersionError(
+            f"Database schema v{version:04d} is newer than this code (v{HEAD_VERSION:04d})"
+        )
@@ -0,0 +1,74 @@
+"""
+Migration CLI.
+
+Usage:
+    python -m accessai.migrations upgrade [--to VERSION]
+    python -m accessai.migrations current
+    python -m accessai.migrations check
+    python -m accessai.migrations list
+"""
+
+import argparse
+import asyncio
+import sys
+from ..config import settings
+from ..database import engine
+from ..services.ledger_maintenance import ensure_partitions
+from . import MIGRATIONS, HEAD_VERSION, SchemaVersionError, current_version, upgrade, verify_schema
+
+# First version with a monthly-partitioned credit_transactions (v0005)
+PARTITIONED_LEDGER_VERSION = 5
+
+
+async def run(args) -> int:
+    try:
+        if args.command == "upgrade":
+            applied = await upgrade(engine, target=args.to)
+            if not applied:
+                print("Database is already up to date")
+            version = await current_version(engine)
+            print(f"Schema version: v{version:04d}")
+            # Deploys run this, so every deploy also extends the ledger partitions
+            if version >= PARTITIONED_LEDGER_VERSION:
+                for name in await ensure_partitions(engine, months_ahead=settings.LEDGER_PARTITIONS_AHEAD):
+                    print(f"Created partition {name}")
+
+        elif args.command == "current":
+            version = await current_version(engine)
+            if version is None:
+                print("No migrations applied")
+            else:
+                print(f"Schema version: v{version:04d} (head: v{HEAD_VERSION:04d})")
+
+        elif args.command == "check":
+            await verify_schema(engine)
+            print(f"Schema is at head (v{HEAD_VERSION:04d})")
+
+        elif args.command == "list":
+            for migration in MIGRATIONS:
+                print(f"v{migration.version:04d}  {migration.description}")
+
+    except SchemaVersionError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        await engine.dispose()
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m accessai.migrations", description="AccessAI schema migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Stop at this version")
+    subparsers.add_parser("current", help="Show the database schema version")
+    subparsers.add_parser("check", help="Exit non-zero unless the database is at head")
+    subparsers.add_parser("list", help="List known migrations")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
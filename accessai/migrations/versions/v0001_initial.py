@@ -0,0 +1,46 @@
+"""
+Initial schema, matching what Base.metadata.create_all used to build.
+Uses IF NOT EXISTS so databases created by the old startup path adopt it.
+"""
+
+DESCRIPTION = "initial schema"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id UUID PRIMARY KEY,
+        email VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        google_id VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_google_id ON users (google_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_credits (
+        id SERIAL PRIMARY KEY,
+        user_id UUID NOT NULL UNIQUE REFERENCES users (id),
+        balance INTEGER NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS credit_transactions (
+        id SERIAL PRIMARY KEY,
+        user_id UUID NOT NULL REFERENCES users (id),
+        amount INTEGER NOT NULL,
+        reason VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payments (
+        id SERIAL PRIMARY KEY,
+        stripe_session_id VARCHAR NOT NULL UNIQUE,
+        user_email VARCHAR NOT NULL,
+        credits INTEGER NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+]
@@ -0,0 +1,13 @@
+"""
+Composite index for "latest transactions of a user" queries
+(WHERE user_id = ... ORDER BY created_at DESC LIMIT n).
+"""
+
+DESCRIPTION = "index credit_transactions (user_id, created_at DESC)"
+
+STATEMENTS = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_id_created_at
+    ON credit_transactions (user_id, created_at DESC)
+    """,
+]
@@ -0,0 +1,9 @@
+"""
+Index for looking up payments by customer email.
+"""
+
+DESCRIPTION = "index payments (user_email)"
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_payments_user_email ON payments (user_email)",
+]
@@ -0,0 +1,30 @@
+"""
+Stores a category on every ledger row so history can be filtered in SQL,
+and indexes (user_id, [category,] created_at DESC, id DESC) for keyset
+pagination. The (user_id, created_at DESC, id DESC) index supersedes v0002.
+"""
+
+DESCRIPTION = "credit_transactions.category and keyset pagination indexes"
+
+STATEMENTS = [
+    "ALTER TABLE credit_transactions ADD COLUMN IF NOT EXISTS category VARCHAR",
+    """
+    UPDATE credit_transactions
+    SET category = CASE
+        WHEN reason LIKE '%stripe%' OR reason LIKE '%payment%' THEN 'payment'
+        WHEN amount < 0 THEN 'usage'
+        ELSE 'grant'
+    END
+    WHERE category IS NULL
+    """,
+    "ALTER TABLE credit_transactions ALTER COLUMN category SET NOT NULL",
+    """
+    CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_id_created_at_id
+    ON credit_transactions (user_id, created_at DESC, id DESC)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_id_category_created_at_id
+    ON credit_transactions (user_id, category, created_at DESC, id DESC)
+    """,
+    "DROP INDEX IF EXISTS ix_credit_transactions_user_id_created_at",
+]
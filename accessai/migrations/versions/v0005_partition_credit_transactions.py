@@ -0,0 +1,94 @@
+"""
+Range-partitions credit_transactions by month on created_at and adds the
+credit_transaction_daily rollup table.
+
+The existing table is renamed, a partitioned table takes its place (the
+primary key becomes (id, created_at) because the partition key must be part
+of it), rows are copied over and the old table is dropped. The id sequence
+is handed over to the new table so ids keep increasing.
+
+Partitions are named credit_transactions_YYYY_MM (UTC months) and created by
+create_credit_transactions_partition(); the migration covers the existing
+data through two months ahead, and the ledger maintenance CLI keeps creating
+them. There is deliberately no DEFAULT partition: it would stop the planner
+from using an ordered Append, and "latest rows of a user" queries would then
+probe every partition instead of stopping at the newest ones.
+"""
+
+DESCRIPTION = "partition credit_transactions by month and add daily rollups"
+
+STATEMENTS = [
+    "ALTER TABLE credit_transactions RENAME TO credit_transactions_legacy",
+    "ALTER SEQUENCE credit_transactions_id_seq OWNED BY NONE",
+    """
+    CREATE TABLE credit_transactions (
+        id INTEGER NOT NULL DEFAULT nextval('credit_transactions_id_seq'),
+        user_id UUID NOT NULL REFERENCES users (id),
+        amount INTEGER NOT NULL,
+        reason VARCHAR NOT NULL,
+        category VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "ALTER SEQUENCE credit_transactions_id_seq OWNED BY credit_transactions.id",
+    """
+    CREATE OR REPLACE FUNCTION create_credit_transactions_partition(month DATE) RETURNS VOID AS $$
+    DECLARE
+        start_at TIMESTAMPTZ := date_trunc('month', month)::timestamp AT TIME ZONE 'UTC';
+        end_at TIMESTAMPTZ := (date_trunc('month', month) + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+        partition_name TEXT := 'credit_transactions_' || to_char(month, 'YYYY_MM');
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF credit_transactions FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_at, end_at
+        );
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    DECLARE
+        month DATE;
+    BEGIN
+        FOR month IN
+            SELECT generate_series(
+                date_trunc('month', coalesce(
+                    (SELECT min(created_at) FROM credit_transactions_legacy), now()
+                ) AT TIME ZONE 'UTC'),
+                date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months',
+                interval '1 month'
+            )::date
+        LOOP
+            PERFORM create_credit_transactions_partition(month);
+        END LOOP;
+    END;
+    $$
+    """,
+    """
+    INSERT INTO credit_transactions (id, user_id, amount, reason, category, created_at)
+    SELECT id, user_id, amount, reason, category, coalesce(created_at, now())
+    FROM credit_transactions_legacy
+    """,
+    "DROP TABLE credit_transactions_legacy",
+    # Indexes on the parent are created on every partition, present and future
+    """
+    CREATE INDEX ix_credit_transactions_user_id_created_at_id
+    ON credit_transactions (user_id, created_at DESC, id DESC)
+    """,
+    """
+    CREATE INDEX ix_credit_transactions_user_id_category_created_at_id
+    ON credit_transactions (user_id, category, created_at DESC, id DESC)
+    """,
+    """
+    CREATE TABLE credit_transaction_daily (
+        user_id UUID NOT NULL REFERENCES users (id),
+        day DATE NOT NULL,
+        reason VARCHAR NOT NULL,
+        category VARCHAR NOT NULL,
+        amount BIGINT NOT NULL,
+        transaction_count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day, reason)
+    )
+    """,
+]
@@ -0,0 +1,22 @@
+"""
+Active credit reservations. A hold's amount is already taken out of
+user_credits.balance; the row is deleted when the hold is captured
+(ledger row written), released or expired (amount returned to the balance).
+"""
+
+DESCRIPTION = "credit_holds"
+
+STATEMENTS = [
+    """
+    CREATE TABLE credit_holds (
+        id UUID PRIMARY KEY,
+        user_id UUID NOT NULL REFERENCES users (id),
+        amount INTEGER NOT NULL,
+        reason VARCHAR NOT NULL,
+        category VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+    "CREATE INDEX ix_credit_holds_expires_at ON credit_holds (expires_at)",
+]
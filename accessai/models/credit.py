@@ -1,8 +1,24 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+import uuid
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from ..database import Base
 
+# Transaction categories, stored on each row so history can be filtered in SQL
+CATEGORY_PAYMENT = "payment"  # credits bought through Stripe
+CATEGORY_USAGE = "usage"      # credits spent on AI features
+CATEGORY_GRANT = "grant"      # other credits added (e.g. signup bonus)
+TRANSACTION_CATEGORIES = (CATEGORY_PAYMENT, CATEGORY_USAGE, CATEGORY_GRANT)
+
+
+def transaction_category(amount: int, reason: str) -> str:
+    """Derive the category of a ledger row from its amount and reason."""
+    if "stripe" in reason or "payment" in reason:
+        return CATEGORY_PAYMENT
+    if amount < 0:
+        return CATEGORY_USAGE
+    return CATEGORY_GRANT
+
 
 class UserCredit(Base):
     __tablename__ = "user_credits"
@@ -14,10 +30,58 @@ class UserCredit(Base):
 
 
 class CreditTransaction(Base):
+    """
+    One ledger row per balance change.
+    
+    In the database this table is range-partitioned by month on created_at
+    and its primary key is (id, created_at) (migration v0005); ids are still
+    unique, so the ORM identifies rows by id alone.
+    """
     __tablename__ = "credit_transactions"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     amount = Column(Integer, nullable=False)  # positive = added, negative = spent
     reason = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    category = Column(String, nullable=False)  # see transaction_category()
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination over a user's history, optionally by category (migration v0004)
+        Index("ix_credit_transactions_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        Index(
+            "ix_credit_transactions_user_id_category_created_at_id",
+            user_id, category, created_at.desc(), id.desc()
+        ),
+    )
+
+
+class CreditDailyRollup(Base):
+    """
+    Per-user, per-reason daily totals of ledger rows that were compacted
+    out of old credit_transactions partitions.
+    """
+    __tablename__ = "credit_transaction_daily"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    reason = Column(String, primary_key=True)
+    category = Column(String, nullable=False)
+    amount = Column(BigInteger, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+
+
+class CreditHold(Base):
+    """
+    An active reservation of credits for a job that has not finished yet.
+    The amount is already deducted from the balance; see place_hold().
+    """
+    __tablename__ = "credit_holds"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
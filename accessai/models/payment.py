@@ -8,6 +8,6 @@ class Payment(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     stripe_session_id = Column(String, unique=True, nullable=False)
-    user_email = Column(String, nullable=False)
+    user_email = Column(String, index=True, nullable=False)
     credits = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
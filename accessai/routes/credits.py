@@ -1,23 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import Literal
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from ..config import settings
 from ..database import get_db
 from ..models.user import User
 from ..dependencies.auth import get_current_user
+from ..dependencies.rate_limit import RateLimit
 from ..services.credit import (
     get_user_credits, 
     get_user_transactions, 
-    deduct_credits, 
-    InsufficientCreditsError
+    get_transactions_page,
+    add_credits,
+    deduct_credits,
+    place_batch_hold,
+    capture_hold,
+    release_hold,
+    InsufficientCreditsError,
+    InvalidCursorError,
+    HoldNotFoundError
 )
-
-# Rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
+from ..services.export import EXPORT_FORMATS, export_transactions
+from ..services import ai
+from ..services.batching import summarize_batcher, analyze_batcher
+from ..services.result_cache import result_cache, hit_cost, normalize_text
 
 router = APIRouter(prefix="/credits", tags=["Credits"])
 
+logger = structlog.get_logger()
+
 
 # Request models with validation
 class SummarizeRequest(BaseModel):
@@ -28,6 +41,19 @@ class AnalyzeRequest(BaseModel):
     text: str = Field(min_length=10, max_length=2000, description="Text to analyze (10-2000 characters)")
 
 
+BatchMode = Literal["all_or_nothing", "best_effort"]
+
+
+class SummarizeBatchRequest(BaseModel):
+    items: list[SummarizeRequest] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    mode: BatchMode = Field("all_or_nothing", description="all_or_nothing: fail unless every item is paid for; best_effort: run as many items as the balance covers")
+
+
+class AnalyzeBatchRequest(BaseModel):
+    items: list[AnalyzeRequest] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    mode: BatchMode = Field("all_or_nothing", description="all_or_nothing: fail unless every item is paid for; best_effort: run as many items as the balance covers")
+
+
 @router.get("/balance")
 async def get_balance(
     current_user: User = Depends(get_current_user),
@@ -58,47 +84,186 @@ async def get_balance(
     }
 
 
-@router.post("/summarize", tags=["AI Features"])
-@limiter.limit("20/minute")
-async def summarize(
-    request: Request,
-    request_data: SummarizeRequest,
+@router.get("/transactions")
+async def get_transactions(
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    category: Literal["payment", "usage", "grant"] | None = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Summarize text - costs 10 credits.
-    Returns a fake summary of the input text.
-    Rate limit: 20 requests per minute.
+    Get current user's transaction history, newest first, one page at a time.
+    Pass the returned next_cursor to get the following page.
+    Requires JWT authentication.
     """
-    text = request_data.text
-    COST = 10
-    
-    # Try to deduct credits
     try:
-        await deduct_credits(db, str(current_user.id), COST, "summarize")
-    except InsufficientCreditsError:
-        # Get current balance for error response
-        user_credits = await get_user_credits(db, str(current_user.id))
-        balance = user_credits.balance if user_credits else 0
-        raise HTTPException(
-            status_code=status.HTTP_402_PAYMENT_REQUIRED,
-            detail={
-                "error": "insufficient_credits",
-                "balance": balance,
-                "required": COST
+        transactions, next_cursor = await get_transactions_page(
+            db, str(current_user.id), limit, cursor=cursor, category=category
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {
+        "transactions": [
+            {
+                "id": t.id,
+                "amount": t.amount,
+                "reason": t.reason,
+                "category": t.category,
+                "created_at": t.created_at
             }
+            for t in transactions
+        ],
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/export")
+async def export_ledger(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download current user's full credit ledger as NDJSON or CSV.
+    Rows are streamed from a server-side cursor, so memory use does not
+    grow with the size of the ledger. Set gzip=true to compress the stream.
+    Months older than the ledger retention window are compacted into daily
+    totals and no longer exported.
+    Requires JWT authentication.
+    """
+    headers = {"Content-Disposition": f'attachment; filename="ledger.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(
+        export_transactions(str(current_user.id), fmt=format, gzip=gzip),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers
+    )
+
+
+def insufficient_credits(balance: int, required: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_402_PAYMENT_REQUIRED,
+        detail={
+            "error": "insufficient_credits",
+            "balance": balance,
+            "required": required
+        }
+    )
+
+
+async def run_single(db: AsyncSession, user_id: str, text: str, cost: int, op: str, process) -> dict:
+    """
+    Pay for and process one item. Cached results are returned without
+    running the model and cost hit_cost(cost). Otherwise the credits are
+    deducted in one statement before the model runs, and refunded if it
+    fails; the work is bounded by the request, so no hold is needed.
+    
+    `process` is an async fn(text) -> result, normally a micro-batcher's
+    submit, so concurrent requests share backend calls.
+    """
+    cached = await result_cache.get(op, text)
+    
+    try:
+        if cached is not None:
+            price = hit_cost(cost)
+            if price:
+                await deduct_credits(db, user_id, price, f"{op}_cached")
+            return cached
+        await deduct_credits(db, user_id, cost, op)
+    except InsufficientCreditsError as e:
+        # The deduction already reports the balance it saw
+        raise insufficient_credits(e.balance, e.required)
+    
+    try:
+        result = await process(text)
+    except Exception:
+        await add_credits(db, user_id, cost, f"{op}_refund")
+        raise
+    
+    await result_cache.set(op, text, result)
+    return result
+
+
+async def run_batch(db: AsyncSession, user_id: str, texts: list[str], cost: int, op: str, mode: str, process) -> dict:
+    """
+    Pay for and process a batch of items with one hold and one ledger row.
+    In best_effort mode, items the balance does not cover are skipped and
+    reported as insufficient_credits; results are always in input order.
+    
+    The hold is taken at full price. Items served from the result cache (or
+    repeated within the batch) are charged hit_cost(cost), and the unspent
+    part of the hold goes back to the balance on capture. If the hold
+    expired while the batch ran, the charge is deducted directly instead,
+    and the results are dropped with a 402 if the balance no longer covers it.
+    """
+    try:
+        hold_id, paid = await place_batch_hold(
+            db, user_id, cost, len(texts), f"{op}_batch", partial=(mode == "best_effort")
         )
+    except InsufficientCreditsError as e:
+        raise insufficient_credits(e.balance, cost * len(texts) if mode == "all_or_nothing" else cost)
+    
+    paid_texts = texts[:paid]
+    results = await result_cache.get_many(op, paid_texts)
+    
+    # Run the model once per distinct uncached text
+    pending: dict[str, list[int]] = {}
+    for i, result in enumerate(results):
+        if result is None:
+            pending.setdefault(normalize_text(paid_texts[i]), []).append(i)
+    try:
+        computed = process([paid_texts[indexes[0]] for indexes in pending.values()])
+    except Exception:
+        await release_hold(db, hold_id)
+        raise
+    
+    for indexes, result in zip(pending.values(), computed):
+        for i in indexes:
+            results[i] = result
+    
+    charge = len(pending) * cost + (paid - len(pending)) * hit_cost(cost)
+    try:
+        charged = await capture_hold(db, hold_id, charge)
+    except HoldNotFoundError:
+        # Expired and swept while the batch ran: the credits are back, so
+        # charge them again directly
+        logger.warning("Credit hold expired before capture", op=f"{op}_batch", user_id=user_id)
+        try:
+            if charge:
+                await deduct_credits(db, user_id, charge, f"{op}_batch")
+        except InsufficientCreditsError as e:
+            raise insufficient_credits(e.balance, e.required)
+        charged = charge
+    await result_cache.set_many(op, {paid_texts[indexes[0]]: result for indexes, result in zip(pending.values(), computed)})
     
-    # Return fake summary (first 50 characters)
-    summary = f"Summary: {text[:50]}..."
-    return {"result": summary}
+    results += [{"error": "insufficient_credits"}] * (len(texts) - paid)
+    return {"results": results, "processed": paid, "charged": charged}
+
+
+@router.post("/summarize", tags=["AI Features"], dependencies=[Depends(RateLimit("20/minute"))])
+async def summarize(
+    request_data: SummarizeRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Summarize text - costs 10 credits.
+    Returns a fake summary of the input text.
+    Repeated texts are served from the result cache.
+    Rate limit: 20 requests per minute per user.
+    """
+    return await run_single(
+        db, str(current_user.id), request_data.text,
+        ai.SUMMARIZE_COST, "summarize", summarize_batcher.submit
+    )
 
 
-@router.post("/analyze", tags=["AI Features"])
-@limiter.limit("20/minute")
+@router.post("/analyze", tags=["AI Features"], dependencies=[Depends(RateLimit("20/minute"))])
 async def analyze(
-    request: Request,
     request_data: AnalyzeRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -106,31 +271,48 @@ async def analyze(
     """
     Analyze text - costs 25 credits.
     Returns word count and sentiment (fake).
-    Rate limit: 20 requests per minute.
+    Repeated texts are served from the result cache.
+    Rate limit: 20 requests per minute per user.
     """
-    text = request_data.text
-    COST = 25
-    
-    # Try to deduct credits
-    try:
-        await deduct_credits(db, str(current_user.id), COST, "analyze")
-    except InsufficientCreditsError:
-        # Get current balance for error response
-        user_credits = await get_user_credits(db, str(current_user.id))
-        balance = user_credits.balance if user_credits else 0
-        raise HTTPException(
-            status_code=status.HTTP_402_PAYMENT_REQUIRED,
-            detail={
-                "error": "insufficient_credits",
-                "balance": balance,
-                "required": COST
-            }
-        )
-    
-    # Return fake analysis
-    word_count = len(text.split())
-    return {
-        "result": "Analysis complete.",
-        "word_count": word_count,
-        "sentiment": "Positive"
-    }
+    return await run_single(
+        db, str(current_user.id), request_data.text,
+        ai.ANALYZE_COST, "analyze", analyze_batcher.submit
+    )
+
+
+@router.post("/summarize/batch", tags=["AI Features"], dependencies=[Depends(RateLimit("20/minute"))])
+async def summarize_batch(
+    request_data: SummarizeBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Summarize up to BATCH_MAX_ITEMS texts - costs 10 credits per item.
+    Texts served from the result cache, or repeated within the batch, are
+    charged the cache-hit price.
+    The batch is charged as one ledger row and results are in input order.
+    Rate limit: 20 batches per minute per user.
+    """
+    return await run_batch(
+        db, str(current_user.id), [item.text for item in request_data.items],
+        ai.SUMMARIZE_COST, "summarize", request_data.mode, ai.summarize_many
+    )
+
+
+@router.post("/analyze/batch", tags=["AI Features"], dependencies=[Depends(RateLimit("20/minute"))])
+async def analyze_batch(
+    request_data: AnalyzeBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Analyze up to BATCH_MAX_ITEMS texts - costs 25 credits per item.
+    Texts served from the result cache, or repeated within the batch, are
+    charged the cache-hit price.
+    The batch is charged as one ledger row and results are in input order.
+    Rate limit: 20 batches per minute per user.
+    """
+    return await run_batch(
+        db, str(current_user.id), [item.text for item in request_data.items],
+        ai.ANALYZE_COST, "analyze", request_data.mode, ai.analyze_many
+    )
@@ -0,0 +1,82 @@
+import uuid
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..models.user import User
+from ..dependencies.auth import get_current_user
+from ..dependencies.rate_limit import RateLimit
+from ..services.credit import InsufficientCreditsError
+from ..services.jobs import job_queue, job_events, QueueFullError, Job
+
+router = APIRouter(prefix="/jobs", tags=["AI Jobs"])
+
+
+class JobRequest(BaseModel):
+    op: Literal["summarize", "analyze"]
+    text: str = Field(min_length=10, max_length=2000, description="Text to process (10-2000 characters)")
+
+
+def get_job(job_id: uuid.UUID, current_user: User) -> Job:
+    job = job_queue.get(job_id, str(current_user.id))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(RateLimit("20/minute"))])
+async def submit_job(
+    request_data: JobRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue a summarize (10 credits) or analyze (25 credits) job.
+    The credits are held now and only spent if the job succeeds.
+    Poll GET /jobs/{job_id} or stream GET /jobs/{job_id}/events for the result.
+    Rate limit: 20 jobs per minute per user.
+    """
+    try:
+        job = await job_queue.submit(db, str(current_user.id), request_data.op, request_data.text)
+    except InsufficientCreditsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail={
+                "error": "insufficient_credits",
+                "balance": e.balance,
+                "required": e.required
+            }
+        )
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+
+    return {"job_id": str(job.id), "status": job.status}
+
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: uuid.UUID, current_user: User = Depends(get_current_user)):
+    """
+    Get a job's status, and its result once it has finished.
+    Requires JWT authentication.
+    """
+    return get_job(job_id, current_user).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_status(job_id: uuid.UUID, current_user: User = Depends(get_current_user)):
+    """
+    Stream a job's status as server-sent events until it finishes.
+    Requires JWT authentication.
+    """
+    job = get_job(job_id, current_user)
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
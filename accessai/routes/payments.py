@@ -1,19 +1,24 @@
-import stripe
-from fastapi import APIRouter, HTTPException, status, Request, Depends
+import json
+import structlog
+from fastapi import APIRouter, HTTPException, status, Request, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from ..config import settings, CREDIT_PACKAGES
 from ..database import get_db
-from ..services.credit import add_credits_by_email, get_user_transactions
-from ..models.payment import Payment
+from ..services.stripe_gateway import stripe_gateway, StripeError, StripeUnavailableError
+from ..services.credit import (
+    apply_payment,
+    get_transactions_page,
+    InvalidCursorError,
+    PAYMENT_APPLIED,
+    PAYMENT_DUPLICATE
+)
+from ..models.credit import CATEGORY_PAYMENT
 from ..models.user import User
 from ..dependencies.auth import get_current_user
 
-# Configure Stripe with the secret key
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 router = APIRouter(prefix="/payments", tags=["Payments"])
+logger = structlog.get_logger()
 
 
 class CheckoutRequest(BaseModel):
@@ -21,9 +26,14 @@ class CheckoutRequest(BaseModel):
 
 
 @router.post("/checkout")
-async def create_checkout_session(request: CheckoutRequest):
+async def create_checkout_session(
+    request: CheckoutRequest,
+    current_user: User = Depends(get_current_user)
+):
     """
     Create a Stripe checkout session for purchasing credits.
+    The user's id goes into the session metadata, so the webhook can credit
+    the right account. Requires JWT authentication.
     
     Args:
         request: Contains package_name ("starter" or "pro")
@@ -40,31 +50,32 @@ async def create_checkout_session(request: CheckoutRequest):
         )
     
     package = CREDIT_PACKAGES[package_name]
-    price_cents = package["price_usd"] * 100
     
-    # Create checkout session
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
-            "price_data": {
-                "currency": "usd",
-                "product_data": {
-                    "name": f"{package['credits']} Credits - {package_name.title()}",
-                },
-                "unit_amount": price_cents,
-            },
-            "quantity": 1,
-        }],
-        mode="payment",
-        success_url="http://localhost:8000/payments/success",
-        cancel_url="http://localhost:8000/payments/cancel",
-        metadata={
-            "package_name": package_name,
-            "credits": str(package["credits"])
-        }
-    )
+    # Create checkout session for the package's cached Stripe Price
+    try:
+        session = await stripe_gateway.create_checkout_session(
+            package_name,
+            success_url="http://localhost:8000/payments/success",
+            cancel_url="http://localhost:8000/payments/cancel",
+            customer_email=current_user.email,
+            client_reference_id=str(current_user.id),
+            metadata={
+                "package_name": package_name,
+                "credits": str(package["credits"]),
+                "user_id": str(current_user.id)
+            }
+        )
+    except StripeUnavailableError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment provider unavailable, try again later",
+            headers={"Retry-After": str(int(settings.STRIPE_BREAKER_RESET_SECONDS))}
+        )
+    except StripeError as e:
+        logger.error("Checkout session rejected", package_name=package_name, error=str(e))
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Payment provider error")
     
-    return {"checkout_url": session.url}
+    return {"checkout_url": session["url"]}
 
 
 @router.get("/success")
@@ -85,76 +96,82 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     Handle Stripe webhook events.
     Verifies signature and processes payment events.
     
-    This endpoint is called by Stripe after successful payment.
+    This endpoint is called by Stripe after successful payment. Stripe
+    retries deliveries, so a checkout session is applied exactly once: the
+    payment record and the credit grant are one idempotent statement.
     """
+    # The SDK is only needed here, for signature checks; import it on first use
+    import stripe
+    
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
     
     # Verify webhook signature
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload,
             sig_header,
             settings.STRIPE_WEBHOOK_SECRET
         )
+        # Read the verified payload as plain dicts (newer stripe versions
+        # return objects without dict methods)
+        event = json.loads(payload)
     except ValueError:
-        # Invalid payload
-        return {"error": "Invalid payload"}, 400
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid payload")
     except stripe.error.SignatureVerificationError:
-        # Invalid signature
-        return {"error": "Invalid signature"}, 400
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid signature")
     
     # Handle the event
     if event["type"] == "checkout.session.completed":
         session = event["data"]["object"]
-        
-        # Get session ID for idempotency check
         session_id = session.get("id")
+        metadata = session.get("metadata") or {}
+        credits = int(metadata.get("credits", 0))
+        user_id = metadata.get("user_id")
+        # Sessions created before user ids were in the metadata
+        customer_email = (session.get("customer_details") or {}).get("email")
         
-        # Check if already processed
-        stmt = select(Payment).where(Payment.stripe_session_id == session_id)
-        result = await db.execute(stmt)
-        existing_payment = result.scalar_one_or_none()
-        
-        if existing_payment:
-            return {"status": "already_processed"}
+        if not session_id or not credits or not (user_id or customer_email):
+            logger.warning("Checkout session without credits or customer", session_id=session_id)
+            return {"status": "ignored"}
         
-        # Get customer email and credits from metadata
-        customer_email = session.get("customer_details", {}).get("email")
-        credits = int(session.get("metadata", {}).get("credits", 0))
+        try:
+            outcome = await apply_payment(
+                db, session_id, credits, user_id=user_id, email=customer_email
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user id in metadata")
         
-        if customer_email and credits:
-            # Add credits to user account
-            credit_result = await add_credits_by_email(db, customer_email, credits, "stripe_payment")
-            if credit_result:
-                # Record the payment to prevent duplicates
-                payment = Payment(
-                    stripe_session_id=session_id,
-                    user_email=customer_email,
-                    credits=credits
-                )
-                db.add(payment)
-                await db.commit()
-                print(f"Added {credits} credits to {customer_email}")
-            else:
-                print(f"User not found for email: {customer_email}")
+        if outcome == PAYMENT_DUPLICATE:
+            return {"status": "already_processed"}
+        if outcome == PAYMENT_APPLIED:
+            logger.info("Payment applied", session_id=session_id, user_id=user_id, credits=credits)
+        else:
+            logger.warning("User not found for payment", session_id=session_id, user_id=user_id, email=customer_email)
     
     return {"status": "success"}
 
 
 @router.get("/history")
 async def get_payment_history(
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get user's payment-related credit transactions.
+    Get user's payment-related credit transactions, one page at a time.
+    Pass the returned next_cursor to get the following page.
     Requires JWT authentication.
     """
-    # Get user's transactions
-    transactions = await get_user_transactions(db, str(current_user.id), limit=10)
+    # Filter for payment-related transactions in SQL
+    try:
+        transactions, next_cursor = await get_transactions_page(
+            db, str(current_user.id), limit, cursor=cursor, category=CATEGORY_PAYMENT
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    # Filter for payment-related transactions
     payment_transactions = [
         {
             "id": t.id,
@@ -163,7 +180,6 @@ async def get_payment_history(
             "created_at": t.created_at
         }
         for t in transactions
-        if "stripe" in t.reason or "payment" in t.reason
     ]
     
-    return {"transactions": payment_transactions}
+    return {"transactions": payment_transactions, "next_cursor": next_cursor}
@@ -0,0 +1,34 @@
+# Bump when the backing model changes; part of every result cache key
+MODEL_VERSION = "fake-1"
+
+# Credits charged per item
+SUMMARIZE_COST = 10
+ANALYZE_COST = 25
+
+
+def summarize(text: str) -> dict:
+    """
+    Summarize text. Returns a fake summary (first 50 characters).
+    """
+    return {"result": f"Summary: {text[:50]}..."}
+
+
+def analyze(text: str) -> dict:
+    """
+    Analyze text. Returns word count and sentiment (fake).
+    """
+    return {
+        "result": "Analysis complete.",
+        "word_count": len(text.split()),
+        "sentiment": "Positive"
+    }
+
+
+def summarize_many(texts: list[str]) -> list[dict]:
+    """Summarize several texts; results are in input order."""
+    return [summarize(text) for text in texts]
+
+
+def analyze_many(texts: list[str]) -> list[dict]:
+    """Analyze several texts; results are in input order."""
+    return [analyze(text) for text in texts]
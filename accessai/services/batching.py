@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+from typing import Any, Callable
+from prometheus_client import Histogram
+from ..config import settings
+from . import ai
+
+INFERENCE_BATCH_SIZE = Histogram(
+    "accessai_inference_batch_size",
+    "Items per backend call made by the micro-batcher",
+    ["op"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into one vectorized backend call.
+
+    The first item to arrive opens a window; the window is flushed after
+    `max_wait` seconds or as soon as it holds `max_batch` items, whichever
+    comes first. The backend receives the items as a list and must return
+    the results in the same order; each caller gets its own result (or the
+    backend's exception) back.
+    """
+
+    def __init__(self, name: str, backend: Callable, max_batch: int, max_wait: float):
+        """
+        Args:
+            name: Label used for the batch size metric
+            backend: fn(items) -> results, plain or async
+            max_batch: Largest batch sent to the backend
+            max_wait: Seconds the first item of a batch may wait for others
+        """
+        self.name = name
+        self.backend = backend
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            # The loop only keeps weak references to tasks
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list):
+        INFERENCE_BATCH_SIZE.labels(self.name).observe(len(batch))
+        try:
+            results = self.backend([item for item, _ in batch])
+            if inspect.isawaitable(results):
+                results = await results
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} backend returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have gone away (client disconnect)
+            if not future.done():
+                future.set_result(result)
+
+
+# One batcher per AI operation, in front of the fake backend
+summarize_batcher = MicroBatcher(
+    "summarize",
+    ai.summarize_many,
+    max_batch=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait=settings.INFERENCE_BATCH_MAX_WAIT_MS / 1000
+)
+analyze_batcher = MicroBatcher(
+    "analyze",
+    ai.analyze_many,
+    max_batch=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait=settings.INFERENCE_BATCH_MAX_WAIT_MS / 1000
+)
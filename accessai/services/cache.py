@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+from prometheus_client import Counter
+
+# Hit/miss counters for every in-process cache, labelled by cache name
+CACHE_REQUESTS = Counter(
+    "accessai_cache_requests_total",
+    "In-process cache lookups",
+    ["cache", "result"]
+)
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry expiry and LRU eviction.
+
+    Not shared between workers; each process keeps its own copy, so the TTL
+    is the upper bound on how stale an entry can be.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        """
+        Args:
+            name: Label used for the hit/miss metrics
+            maxsize: Maximum number of entries (0 disables the cache)
+            ttl: Default lifetime of an entry in seconds
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired."""
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+                return value
+            del self._data[key]
+
+        self.misses += 1
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Lifetime in seconds, capped at the cache's default ttl
+        """
+        if self.maxsize <= 0:
+            return
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + lifetime, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry if present."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
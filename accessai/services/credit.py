@@ -1,11 +1,34 @@
+import asyncio
+import base64
 import uuid
+from datetime import datetime, timedelta
+import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from ..models.credit import UserCredit, CreditTransaction
+from sqlalchemy import select, update, insert, delete, literal, literal_column, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..config import settings
+from ..database import async_session
+from ..models.credit import UserCredit, CreditTransaction, CreditHold, transaction_category
+from ..models.payment import Payment
+from ..models.user import User
+from .ledger import ledger_writer
+
+logger = structlog.get_logger()
 
 
 class InsufficientCreditsError(Exception):
     """Raised when user doesn't have enough credits to complete a transaction."""
+
+    def __init__(self, balance: int, required: int):
+        self.balance = balance
+        self.required = required
+        super().__init__(
+            f"Insufficient credits. Required: {required}, Available: {balance}"
+        )
+
+
+class HoldNotFoundError(Exception):
+    """Raised when a hold was already captured, released or expired."""
     pass
 
 
@@ -37,64 +60,416 @@ async def add_credits(db: AsyncSession, user_id: str, amount: int, reason: str):
     # Add credits
     user_credit.balance += amount
     
-    # Log transaction
-    transaction = CreditTransaction(
-        user_id=user_uuid,
-        amount=amount,
-        reason=reason
-    )
-    db.add(transaction)
+    # Log transaction, either in this transaction or through the ledger writer
+    if not ledger_writer.buffered:
+        transaction = CreditTransaction(
+            user_id=user_uuid,
+            amount=amount,
+            reason=reason,
+            category=transaction_category(amount, reason)
+        )
+        db.add(transaction)
     
     await db.commit()
     await db.refresh(user_credit)
+
+    if ledger_writer.buffered:
+        await ledger_writer.record(user_uuid, amount, reason)
     return user_credit
 
 
-async def deduct_credits(db: AsyncSession, user_id: str, amount: int, reason: str):
+def _debit(user_uuid: uuid.UUID, amount: int):
+    """CTE that decrements the balance only if it covers the amount."""
+    return (
+        update(UserCredit)
+        .where(UserCredit.user_id == user_uuid, UserCredit.balance >= amount)
+        .values(balance=UserCredit.balance - amount, updated_at=func.now())
+        .returning(UserCredit.user_id, UserCredit.balance)
+        .cte("debited")
+    )
+
+
+def _debit_result(debited, user_uuid: uuid.UUID):
+    """
+    SELECT (new_balance, current_balance) around a _debit CTE.
+
+    The outer SELECT sees the pre-update snapshot, which gives us the
+    current balance for the error payload when nothing was debited.
+    """
+    return select(
+        select(debited.c.balance).scalar_subquery().label("new_balance"),
+        select(UserCredit.balance)
+        .where(UserCredit.user_id == user_uuid)
+        .scalar_subquery()
+        .label("current_balance"),
+    )
+
+
+async def deduct_credits(db: AsyncSession, user_id: str, amount: int, reason: str) -> int:
     """
     Deduct credits from user balance if sufficient.
     Raises InsufficientCreditsError if not enough balance.
-    
+
+    The balance check, the decrement and the ledger insert run as a single
+    statement (conditional UPDATE ... RETURNING feeding an INSERT through a
+    CTE), so concurrent deductions can never spend the same credits twice.
+    When the ledger writer is buffered, the row is queued there instead.
+
     Args:
         db: Database session
         user_id: The user's UUID (as string)
         amount: Number of credits to deduct
         reason: Description of why credits were deducted
-    
+
     Returns:
-        Updated UserCredit object
-    
+        The new balance after the deduction
+
     Raises:
         InsufficientCreditsError: If balance is less than amount
     """
     # Convert string to UUID
     user_uuid = uuid.UUID(user_id)
-    
-    # Get user credit
-    stmt = select(UserCredit).where(UserCredit.user_id == user_uuid)
+
+    debited = _debit(user_uuid, amount)
+    stmt = _debit_result(debited, user_uuid)
+
+    # Log transaction (negative amount) for the row that was debited
+    if not ledger_writer.buffered:
+        logged = (
+            insert(CreditTransaction)
+            .from_select(
+                ["user_id", "amount", "reason", "category"],
+                select(
+                    debited.c.user_id,
+                    literal(-amount),
+                    literal(reason),
+                    literal(transaction_category(-amount, reason)),
+                ),
+            )
+            .cte("logged")
+        )
+        stmt = stmt.add_cte(logged)
+
     result = await db.execute(stmt)
-    user_credit = result.scalar_one_or_none()
-    
-    if not user_credit or user_credit.balance < amount:
-        current_balance = user_credit.balance if user_credit else 0
-        raise InsufficientCreditsError(
-            f"Insufficient credits. Required: {amount}, Available: {current_balance}"
+    new_balance, current_balance = result.one()
+
+    if new_balance is None:
+        await db.rollback()
+        raise InsufficientCreditsError(balance=current_balance or 0, required=amount)
+
+    await db.commit()
+
+    if ledger_writer.buffered:
+        await ledger_writer.record(user_uuid, -amount, reason)
+    return new_balance
+
+
+async def place_hold(
+    db: AsyncSession,
+    user_id: str,
+    amount: int,
+    reason: str,
+    ttl_seconds: int | None = None
+) -> uuid.UUID:
+    """
+    Reserve credits for a job before running it.
+
+    Like deduct_credits, the balance check, the decrement and the hold
+    insert are one statement, so holds can never overdraw the balance. No
+    ledger row is written yet; call capture_hold when the job succeeds or
+    release_hold when it fails. Holds that are neither are returned to the
+    balance by sweep_expired_holds after ttl_seconds.
+
+    Args:
+        db: Database session
+        user_id: The user's UUID (as string)
+        amount: Number of credits to reserve
+        reason: Description of the job, used for the ledger row on capture
+        ttl_seconds: Lifetime of the hold (default CREDIT_HOLD_TTL_SECONDS)
+
+    Returns:
+        The hold id
+
+    Raises:
+        InsufficientCreditsError: If balance is less than amount
+    """
+    user_uuid = uuid.UUID(user_id)
+    hold_id = uuid.uuid4()
+    ttl = timedelta(seconds=ttl_seconds or settings.CREDIT_HOLD_TTL_SECONDS)
+
+    debited = _debit(user_uuid, amount)
+    held = (
+        insert(CreditHold)
+        .from_select(
+            ["id", "user_id", "amount", "reason", "category", "expires_at"],
+            select(
+                literal(hold_id, CreditHold.id.type),
+                debited.c.user_id,
+                literal(amount),
+                literal(reason),
+                literal(transaction_category(-amount, reason)),
+                func.now() + ttl,
+            ),
         )
-    
-    # Deduct credits
-    user_credit.balance -= amount
-    
-    # Log transaction (negative amount)
-    transaction = CreditTransaction(
-        user_id=user_uuid,
-        amount=-amount,
-        reason=reason
+        .cte("held")
     )
-    db.add(transaction)
-    
+    stmt = _debit_result(debited, user_uuid).add_cte(held)
+
+    result = await db.execute(stmt)
+    new_balance, current_balance = result.one()
+
+    if new_balance is None:
+        await db.rollback()
+        raise InsufficientCreditsError(balance=current_balance or 0, required=amount)
+
     await db.commit()
-    await db.refresh(user_credit)
-    return user_credit
+    return hold_id
+
+
+async def place_batch_hold(
+    db: AsyncSession,
+    user_id: str,
+    unit_cost: int,
+    count: int,
+    reason: str,
+    partial: bool = False
+) -> tuple[uuid.UUID, int]:
+    """
+    Reserve credits for a batch of `count` items costing `unit_cost` each.
+
+    With partial=False this is a hold for the whole batch. With partial=True
+    it holds as many items as the balance covers, still in one statement:
+    the user's row is locked, the affordable item count is computed from the
+    locked balance, and the decrement and hold insert use that count.
+
+    Args:
+        db: Database session
+        user_id: The user's UUID (as string)
+        unit_cost: Credits per item
+        count: Number of items in the batch
+        reason: Description of the job, used for the ledger row on capture
+        partial: Hold fewer items if the balance does not cover all of them
+
+    Returns:
+        Tuple of (hold id, number of items held)
+
+    Raises:
+        InsufficientCreditsError: If the balance covers no item (partial) or
+            not every item (all-or-nothing)
+    """
+    if not partial:
+        hold_id = await place_hold(db, user_id, unit_cost * count, reason)
+        return hold_id, count
+
+    user_uuid = uuid.UUID(user_id)
+    hold_id = uuid.uuid4()
+    ttl = timedelta(seconds=settings.CREDIT_HOLD_TTL_SECONDS)
+
+    locked = (
+        select(UserCredit.user_id, func.least(count, UserCredit.balance // unit_cost).label("units"))
+        .where(UserCredit.user_id == user_uuid, UserCredit.balance >= unit_cost)
+        .with_for_update()
+        .cte("locked")
+    )
+    debited = (
+        update(UserCredit)
+        .where(UserCredit.user_id == locked.c.user_id)
+        .values(balance=UserCredit.balance - locked.c.units * unit_cost, updated_at=func.now())
+        .returning(UserCredit.user_id, UserCredit.balance, locked.c.units)
+        .cte("debited")
+    )
+    held = (
+        insert(CreditHold)
+        .from_select(
+            ["id", "user_id", "amount", "reason", "category", "expires_at"],
+            select(
+                literal(hold_id, CreditHold.id.type),
+                debited.c.user_id,
+                debited.c.units * unit_cost,
+                literal(reason),
+                literal(transaction_category(-unit_cost, reason)),
+                func.now() + ttl,
+            ),
+        )
+        .cte("held")
+    )
+    stmt = select(
+        select(debited.c.units).scalar_subquery().label("units"),
+        select(UserCredit.balance)
+        .where(UserCredit.user_id == user_uuid)
+        .scalar_subquery()
+        .label("current_balance"),
+    ).add_cte(held)
+
+    result = await db.execute(stmt)
+    units, current_balance = result.one()
+
+    if units is None:
+        await db.rollback()
+        raise InsufficientCreditsError(balance=current_balance or 0, required=unit_cost)
+
+    await db.commit()
+    return hold_id, units
+
+
+async def capture_hold(db: AsyncSession, hold_id: uuid.UUID, amount: int | None = None) -> int:
+    """
+    Spend the credits of a hold: delete it and write its ledger row in one
+    statement. The balance was already decremented by place_hold.
+
+    Pass `amount` when the job turned out cheaper than the hold; only that
+    much is spent and the rest goes back to the balance in the same
+    statement. No ledger row is written when nothing is spent.
+
+    Args:
+        db: Database session
+        hold_id: Id returned by place_hold
+        amount: Credits to spend (default and maximum: the held amount)
+
+    Returns:
+        The number of credits captured
+
+    Raises:
+        HoldNotFoundError: If the hold was already captured, released or expired
+    """
+    captured = (
+        delete(CreditHold)
+        .where(CreditHold.id == hold_id)
+        .returning(CreditHold.user_id, CreditHold.amount, CreditHold.reason, CreditHold.category)
+        .cte("captured")
+    )
+    if amount is None:
+        charged = captured.c.amount
+    else:
+        charged = func.least(captured.c.amount, amount)
+        refunded = (
+            update(UserCredit)
+            .where(UserCredit.user_id == captured.c.user_id, captured.c.amount > amount)
+            .values(balance=UserCredit.balance + captured.c.amount - amount, updated_at=func.now())
+            .returning(UserCredit.user_id)
+            .cte("refunded")
+        )
+    stmt = select(captured.c.user_id, charged.label("amount"), captured.c.reason)
+    if amount is not None:
+        stmt = stmt.add_cte(refunded)
+
+    if not ledger_writer.buffered:
+        logged = (
+            insert(CreditTransaction)
+            .from_select(
+                ["user_id", "amount", "reason", "category"],
+                select(captured.c.user_id, -charged, captured.c.reason, captured.c.category)
+                .where(charged > 0),
+            )
+            .cte("logged")
+        )
+        stmt = stmt.add_cte(logged)
+
+    result = await db.execute(stmt)
+    row = result.one_or_none()
+
+    if row is None:
+        await db.rollback()
+        raise HoldNotFoundError(f"Credit hold {hold_id} is no longer active")
+
+    await db.commit()
+
+    if ledger_writer.buffered and row.amount > 0:
+        await ledger_writer.record(row.user_id, -row.amount, row.reason)
+    return row.amount
+
+
+async def release_hold(db: AsyncSession, hold_id: uuid.UUID) -> int:
+    """
+    Cancel a hold and return its credits to the balance, in one statement.
+    Nothing is written to the ledger, since the credits were never spent.
+
+    Args:
+        db: Database session
+        hold_id: Id returned by place_hold
+
+    Returns:
+        The balance after the credits were returned
+
+    Raises:
+        HoldNotFoundError: If the hold was already captured, released or expired
+    """
+    released = (
+        delete(CreditHold)
+        .where(CreditHold.id == hold_id)
+        .returning(CreditHold.user_id, CreditHold.amount)
+        .cte("released")
+    )
+    refunded = (
+        update(UserCredit)
+        .where(UserCredit.user_id == released.c.user_id)
+        .values(balance=UserCredit.balance + released.c.amount, updated_at=func.now())
+        .returning(UserCredit.balance)
+        .cte("refunded")
+    )
+    stmt = select(refunded.c.balance)
+
+    result = await db.execute(stmt)
+    balance = result.scalar_one_or_none()
+
+    if balance is None:
+        await db.rollback()
+        raise HoldNotFoundError(f"Credit hold {hold_id} is no longer active")
+
+    await db.commit()
+    return balance
+
+
+async def sweep_expired_holds(db: AsyncSession) -> int:
+    """
+    Return the credits of every expired hold to its user's balance.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of holds that expired
+    """
+    expired = (
+        delete(CreditHold)
+        .where(CreditHold.expires_at < func.now())
+        .returning(CreditHold.user_id, CreditHold.amount)
+        .cte("expired")
+    )
+    totals = (
+        select(expired.c.user_id, func.sum(expired.c.amount).label("amount"))
+        .group_by(expired.c.user_id)
+        .cte("totals")
+    )
+    refunded = (
+        update(UserCredit)
+        .where(UserCredit.user_id == totals.c.user_id)
+        .values(balance=UserCredit.balance + totals.c.amount, updated_at=func.now())
+        .returning(UserCredit.user_id)
+        .cte("refunded")
+    )
+    stmt = select(func.count()).select_from(expired).add_cte(refunded)
+
+    result = await db.execute(stmt)
+    count = result.scalar_one()
+    await db.commit()
+    return count
+
+
+async def run_hold_sweeper(interval: float):
+    """
+    Sweep expired holds every `interval` seconds until cancelled.
+    Started from the app lifespan.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as db:
+                expired = await sweep_expired_holds(db)
+            if expired:
+                logger.info("Expired credit holds released", count=expired)
+        except Exception:
+            logger.exception("Credit hold sweep failed")
 
 
 async def get_user_credits(db: AsyncSession, user_id: str) -> UserCredit | None:
@@ -130,13 +505,106 @@ async def get_user_transactions(db: AsyncSession, user_id: str, limit: int = 10)
     stmt = (
         select(CreditTransaction)
         .where(CreditTransaction.user_id == user_uuid)
-        .order_by(CreditTransaction.created_at.desc())
+        .order_by(CreditTransaction.created_at.desc(), CreditTransaction.id.desc())
         .limit(limit)
     )
     result = await db.execute(stmt)
     return result.scalars().all()
 
 
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded."""
+    pass
+
+
+def encode_cursor(transaction: CreditTransaction) -> str:
+    """
+    Build an opaque cursor pointing just after the given transaction.
+    
+    Args:
+        transaction: Last transaction of the current page
+    
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{transaction.created_at.isoformat()}|{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor: Cursor string from a previous page
+    
+    Returns:
+        (created_at, id) of the last transaction on the previous page
+    
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        created_at, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(transaction_id)
+    except ValueError:
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+async def get_transactions_page(
+    db: AsyncSession,
+    user_id: str,
+    limit: int,
+    cursor: str | None = None,
+    category: str | None = None
+):
+    """
+    Get one page of a user's transaction history, newest first.
+    
+    Uses keyset pagination over (created_at, id), so every page is a bounded
+    index range scan no matter how deep the client has scrolled.
+    
+    Args:
+        db: Database session
+        user_id: The user's UUID (as string)
+        limit: Page size
+        cursor: Cursor returned with the previous page, or None for the first page
+        category: Only return transactions of this category
+    
+    Returns:
+        Tuple of (list of CreditTransaction objects, cursor for the next page or None)
+    
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    user_uuid = uuid.UUID(user_id)
+    stmt = select(CreditTransaction).where(CreditTransaction.user_id == user_uuid)
+    
+    if category:
+        stmt = stmt.where(CreditTransaction.category == category)
+    
+    if cursor:
+        created_at, transaction_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(CreditTransaction.created_at, CreditTransaction.id) < tuple_(created_at, transaction_id),
+            # Redundant with the row comparison, but lets the planner prune
+            # ledger partitions newer than the cursor
+            CreditTransaction.created_at <= created_at
+        )
+    
+    # Fetch one extra row to know whether there is a next page
+    stmt = stmt.order_by(
+        CreditTransaction.created_at.desc(), CreditTransaction.id.desc()
+    ).limit(limit + 1)
+    result = await db.execute(stmt)
+    transactions = result.scalars().all()
+    
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        return transactions, encode_cursor(transactions[-1])
+    return transactions, None
+
+
 async def add_credits_by_email(db: AsyncSession, email: str, amount: int, reason: str):
     """
     Find user by email and add credits to their account.
@@ -150,8 +618,6 @@ async def add_credits_by_email(db: AsyncSession, email: str, amount: int, reason
     Returns:
         Updated UserCredit object or None if user not found
     """
-    from ..models.user import User
-    
     # Find user by email
     stmt = select(User).where(User.email == email)
     result = await db.execute(stmt)
@@ -160,3 +626,179 @@ async def add_credits_by_email(db: AsyncSession, email: str, amount: int, reason
     if user:
         return await add_credits(db, str(user.id), amount, reason)
     return None
+
+
+# Credits granted to every new account
+SIGNUP_BONUS_CREDITS = 100
+
+
+async def provision_user(
+    db: AsyncSession,
+    email: str,
+    name: str,
+    google_id: str,
+    bonus: int = SIGNUP_BONUS_CREDITS,
+    reason: str = "signup_bonus"
+):
+    """
+    Get or create the user for an OAuth login, granting the signup bonus to
+    new accounts, in one statement and one transaction.
+
+    The user insert is ON CONFLICT (email) DO UPDATE with a no-op change, so
+    it returns the row whether it was inserted now, existed already, or was
+    inserted by a concurrent login; xmax = 0 tells the cases apart. The
+    balance and ledger inserts only select from a newly inserted row, so a
+    user can no longer exist without their signup credits, and a retried
+    callback grants nothing twice.
+
+    Args:
+        db: Database session
+        email: Email from the identity token
+        name: Display name for a new user
+        google_id: Google subject id for a new user
+        bonus: Credits for a new account
+        reason: Description for the ledger row
+
+    Returns:
+        Row with id, email, name and created (True for a new account)
+    """
+    stmt = pg_insert(User).values(id=uuid.uuid4(), email=email, name=name, google_id=google_id)
+    upserted = (
+        stmt.on_conflict_do_update(index_elements=["email"], set_={"email": stmt.excluded.email})
+        .returning(User.id, User.email, User.name, literal_column("xmax = 0").label("created"))
+        .cte("upserted")
+    )
+    credited = (
+        insert(UserCredit)
+        .from_select(
+            ["user_id", "balance"],
+            select(upserted.c.id, literal(bonus)).where(upserted.c.created),
+        )
+        .returning(UserCredit.user_id)
+        .cte("credited")
+    )
+    stmt = select(upserted.c.id, upserted.c.email, upserted.c.name, upserted.c.created).add_cte(credited)
+
+    if not ledger_writer.buffered:
+        logged = (
+            insert(CreditTransaction)
+            .from_select(
+                ["user_id", "amount", "reason", "category"],
+                select(
+                    credited.c.user_id,
+                    literal(bonus),
+                    literal(reason),
+                    literal(transaction_category(bonus, reason)),
+                ),
+            )
+            .cte("logged")
+        )
+        stmt = stmt.add_cte(logged)
+
+    result = await db.execute(stmt)
+    user = result.one()
+    await db.commit()
+
+    if user.created and ledger_writer.buffered:
+        await ledger_writer.record(user.id, bonus, reason)
+    return user
+
+
+# Outcomes of apply_payment
+PAYMENT_APPLIED = "applied"
+PAYMENT_DUPLICATE = "duplicate"
+PAYMENT_UNKNOWN_USER = "unknown_user"
+
+
+async def apply_payment(
+    db: AsyncSession,
+    stripe_session_id: str,
+    credits: int,
+    user_id: str | None = None,
+    email: str | None = None,
+    reason: str = "stripe_payment"
+) -> str:
+    """
+    Record a completed Stripe checkout and grant its credits, exactly once.
+
+    Everything happens in one statement and one transaction: the payments
+    row is inserted with ON CONFLICT (stripe_session_id) DO NOTHING, and the
+    balance upsert and ledger insert only select from the inserted row, so
+    a retried or concurrently delivered event grants nothing.
+
+    Args:
+        db: Database session
+        stripe_session_id: Checkout session id (the idempotency key)
+        credits: Number of credits bought
+        user_id: The user's UUID (as string), from the session metadata
+        email: Customer email, used only when the session has no user_id
+            (sessions created before user ids were added to the metadata)
+        reason: Description for the ledger row
+
+    Returns:
+        PAYMENT_APPLIED, PAYMENT_DUPLICATE or PAYMENT_UNKNOWN_USER
+    """
+    if user_id is not None:
+        target = select(User.id, User.email).where(User.id == uuid.UUID(user_id))
+    else:
+        target = select(User.id, User.email).where(User.email == email)
+    target = target.cte("target")
+
+    inserted = (
+        pg_insert(Payment)
+        .from_select(
+            ["stripe_session_id", "user_email", "credits"],
+            select(literal(stripe_session_id), target.c.email, literal(credits)),
+        )
+        .on_conflict_do_nothing(index_elements=["stripe_session_id"])
+        .returning(Payment.id)
+        .cte("inserted")
+    )
+    credited = (
+        pg_insert(UserCredit)
+        .from_select(
+            ["user_id", "balance"],
+            select(target.c.id, literal(credits)).select_from(target.join(inserted, literal(True))),
+        )
+    )
+    credited = (
+        credited.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"balance": UserCredit.balance + credited.excluded.balance, "updated_at": func.now()},
+        )
+        .returning(UserCredit.user_id)
+        .cte("credited")
+    )
+    stmt = select(
+        select(target.c.id).scalar_subquery().label("user_id"),
+        select(func.count()).select_from(inserted).scalar_subquery().label("inserted"),
+    ).add_cte(credited)
+
+    if not ledger_writer.buffered:
+        logged = (
+            insert(CreditTransaction)
+            .from_select(
+                ["user_id", "amount", "reason", "category"],
+                select(
+                    credited.c.user_id,
+                    literal(credits),
+                    literal(reason),
+                    literal(transaction_category(credits, reason)),
+                ),
+            )
+            .cte("logged")
+        )
+        stmt = stmt.add_cte(logged)
+
+    result = await db.execute(stmt)
+    user_uuid, inserted_count = result.one()
+    await db.commit()
+
+    if user_uuid is None:
+        return PAYMENT_UNKNOWN_USER
+    if not inserted_count:
+        return PAYMENT_DUPLICATE
+
+    if ledger_writer.buffered:
+        await ledger_writer.record(user_uuid, credits, reason)
+    return PAYMENT_APPLIED
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import uuid
+import zlib
+from typing import AsyncIterator
+from sqlalchemy import select
+from ..database import async_session
+from ..models.credit import CreditTransaction
+
+# Export formats and their media types
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = ["id", "amount", "reason", "category", "created_at"]
+
+
+async def stream_transaction_rows(user_id: str, chunk_size: int = 1000) -> AsyncIterator[list]:
+    """
+    Stream a user's full ledger, oldest first, in chunks of rows.
+    Months compacted by the ledger maintenance rollup (older than
+    LEDGER_RETENTION_MONTHS) are not included: only their daily totals are
+    kept, in credit_transaction_daily.
+
+    Rows are read through a server-side cursor, so only one chunk is held in
+    memory at a time. Uses its own session because a streaming response
+    outlives the request's dependencies.
+
+    Args:
+        user_id: The user's UUID (as string)
+        chunk_size: Rows fetched per round trip
+
+    Yields:
+        Lists of Row objects with the EXPORT_COLUMNS fields
+    """
+    user_uuid = uuid.UUID(user_id)
+    stmt = (
+        select(*(getattr(CreditTransaction, column) for column in EXPORT_COLUMNS))
+        .where(CreditTransaction.user_id == user_uuid)
+        .order_by(CreditTransaction.created_at, CreditTransaction.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    async with async_session() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _ndjson_chunk(rows: list) -> bytes:
+    lines = []
+    for row in rows:
+        record = row._asdict()
+        record["created_at"] = record["created_at"].isoformat() if record["created_at"] else None
+        lines.append(json.dumps(record))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+def _csv_chunk(rows: list) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row.id,
+            row.amount,
+            row.reason,
+            row.category,
+            row.created_at.isoformat() if row.created_at else "",
+        ])
+    return buffer.getvalue().encode()
+
+
+async def export_transactions(
+    user_id: str,
+    fmt: str = "ndjson",
+    gzip: bool = False,
+    chunk_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """
+    Encode a user's ledger as NDJSON or CSV, optionally gzip-compressed.
+
+    Args:
+        user_id: The user's UUID (as string)
+        fmt: "ndjson" or "csv"
+        gzip: Compress the output stream
+        chunk_size: Rows fetched and encoded per chunk
+
+    Yields:
+        Encoded byte chunks, suitable for a StreamingResponse or a file
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    if fmt == "csv":
+        # Emit the header even when the ledger is empty
+        header = _csv_header()
+        yield compressor.compress(header) if compressor else header
+
+    async for rows in stream_transaction_rows(user_id, chunk_size):
+        chunk = _ndjson_chunk(rows) if fmt == "ndjson" else _csv_chunk(rows)
+        if compressor:
+            chunk = compressor.compress(chunk)
+            if not chunk:
+                continue
+        yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,205 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+import structlog
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import text
+from ..config import settings
+from ..database import engine
+from ..migrations import verify_schema
+from .ledger_maintenance import partition_months_ahead
+from .stripe_gateway import stripe_gateway
+
+logger = structlog.get_logger()
+
+DEPENDENCY_UP = Gauge(
+    "accessai_dependency_up",
+    "1 if the last background check of the dependency passed",
+    ["dependency"]
+)
+DEPENDENCY_CHECK_SECONDS = Histogram(
+    "accessai_dependency_check_seconds",
+    "Latency of background dependency checks",
+    ["dependency"]
+)
+
+
+@dataclass
+class DependencyCheck:
+    """A dependency probed in the background."""
+    name: str
+    check: Callable[[], Awaitable]
+    interval: float
+    required: bool  # readiness fails while a required dependency is down
+    once: bool = False  # stop probing after the first pass
+
+
+@dataclass
+class DependencyStatus:
+    """Latest result of a dependency check."""
+    ok: bool | None = None  # None until the first check finishes
+    latency_ms: float | None = None
+    checked_at: float | None = None  # time.monotonic()
+    error: str | None = None
+
+
+class HealthProber:
+    """
+    Checks each dependency on its own interval in the background and keeps
+    the latest result, so health endpoints answer from memory instead of
+    opening a DB session or calling Stripe on every probe.
+    """
+
+    def __init__(self, checks: list[DependencyCheck], timeout: float):
+        """
+        Args:
+            checks: Dependencies to probe
+            timeout: Seconds before a check counts as failed
+        """
+        self.checks = checks
+        self.timeout = timeout
+        self.status: dict[str, DependencyStatus] = {c.name: DependencyStatus() for c in checks}
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, check: DependencyCheck):
+        """Probe another dependency (call before start)."""
+        if check.name not in self.status:
+            self.checks.append(check)
+            self.status[check.name] = DependencyStatus()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(check)) for check in self.checks]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, check: DependencyCheck):
+        while True:
+            await self.probe(check)
+            if check.once and self.status[check.name].ok:
+                return
+            await asyncio.sleep(check.interval)
+
+    async def probe(self, check: DependencyCheck):
+        """Run one check and record its result."""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check.check(), self.timeout)
+            ok, error = True, None
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+
+        DEPENDENCY_CHECK_SECONDS.labels(check.name).observe(latency)
+        DEPENDENCY_UP.labels(check.name).set(1 if ok else 0)
+        status = self.status[check.name]
+        if ok != status.ok:
+            log = logger.info if ok else logger.warning
+            log("Dependency status changed", dependency=check.name, ok=ok, error=error)
+        status.ok = ok
+        status.error = error
+        status.latency_ms = round(latency * 1000, 2)
+        status.checked_at = time.monotonic()
+
+    def is_up(self, check: DependencyCheck) -> bool:
+        """Passed its last check, and that check is recent (the prober isn't stuck)."""
+        status = self.status[check.name]
+        if not status.ok or status.checked_at is None:
+            return False
+        if check.once:
+            return True
+        return time.monotonic() - status.checked_at <= 3 * check.interval + self.timeout
+
+    def ready(self) -> bool:
+        return all(self.is_up(c) for c in self.checks if c.required)
+
+    def report(self) -> dict:
+        """Per-dependency status for the readiness endpoint."""
+        now = time.monotonic()
+        dependencies = {}
+        for check in self.checks:
+            status = self.status[check.name]
+            if status.ok is None:
+                state = "unknown"
+            elif self.is_up(check):
+                state = "ok"
+            else:
+                state = "error" if not status.ok else "stale"
+            dependencies[check.name] = {
+                "status": state,
+                "required": check.required,
+                "latency_ms": status.latency_ms,
+                "checked_seconds_ago": None if status.checked_at is None else round(now - status.checked_at, 1),
+                "error": status.error,
+            }
+        return dependencies
+
+
+def pool_status() -> dict:
+    """Connection pool usage; saturation is the share of all possible connections in use."""
+    pool = engine.pool
+    capacity = pool.size() + max(settings.DB_MAX_OVERFLOW, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+async def check_database():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_schema():
+    await verify_schema(engine)
+
+
+async def check_stripe():
+    # One attempt; skipped without a request while the circuit is open
+    await stripe_gateway.retrieve_account(retries=0)
+
+
+async def check_ledger_partitions():
+    # Fails a month ahead of time: inserts fail once a month has no partition
+    ahead = await partition_months_ahead(engine)
+    if ahead < 1:
+        raise RuntimeError(
+            "Next month's credit_transactions partition is missing. "
+            "Run: python -m accessai.cli.ledger_maintenance partitions"
+        )
+
+
+def schema_check() -> DependencyCheck:
+    """
+    Schema version check, for when startup doesn't wait for it (FAST_STARTUP).
+    Retried until it passes once; the schema doesn't change under a running app.
+    """
+    return DependencyCheck("schema", check_schema, settings.HEALTH_DB_INTERVAL_SECONDS, required=True, once=True)
+
+
+def default_checks() -> list[DependencyCheck]:
+    checks = [
+        DependencyCheck("database", check_database, settings.HEALTH_DB_INTERVAL_SECONDS, required=True),
+        # Alerts only; the partitions are created by migrations and the maintenance CLI
+        DependencyCheck(
+            "ledger_partitions", check_ledger_partitions,
+            settings.LEDGER_PARTITION_CHECK_INTERVAL_SECONDS, required=False
+        ),
+    ]
+    if stripe_gateway.configured:
+        # Payments degrade without Stripe, but the rest of the API works
+        checks.append(DependencyCheck("stripe", check_stripe, settings.HEALTH_STRIPE_INTERVAL_SECONDS, required=False))
+    return checks
+
+
+health_prober = HealthProber(default_checks(), timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import math
+import multiprocessing
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import async_session
+from . import ai
+from .credit import (
+    place_hold,
+    capture_hold,
+    release_hold,
+    deduct_credits,
+    HoldNotFoundError,
+    InsufficientCreditsError
+)
+from .result_cache import result_cache, hit_cost
+
+logger = structlog.get_logger()
+
+# Operations a job can run: function executed in the worker pool, and its price
+JOB_OPERATIONS = {
+    "summarize": (ai.summarize, ai.SUMMARIZE_COST),
+    "analyze": (ai.analyze, ai.ANALYZE_COST),
+}
+
+JOB_QUEUE_DEPTH = Gauge(
+    "accessai_job_queue_depth",
+    "AI jobs waiting for a worker"
+)
+JOB_WAIT_SECONDS = Histogram(
+    "accessai_job_wait_seconds",
+    "Time AI jobs spend queued before a worker picks them up",
+    ["op"]
+)
+JOB_RUN_SECONDS = Histogram(
+    "accessai_job_run_seconds",
+    "Time AI jobs spend running in the worker pool",
+    ["op"]
+)
+JOBS_FINISHED = Counter(
+    "accessai_jobs_finished_total",
+    "AI jobs that finished, by outcome",
+    ["op", "status"]
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at JOB_QUEUE_SIZE."""
+    pass
+
+
+@dataclass
+class Job:
+    """An AI job and its current state. Lives in the process that accepted it."""
+    id: uuid.UUID
+    user_id: str
+    op: str
+    text: str
+    hold_id: uuid.UUID | None = None
+    status: str = QUEUED
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def set_status(self, status: str):
+        """Update the status and wake everyone waiting for a change."""
+        self.status = status
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": str(self.id),
+            "op": self.op,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of AI jobs run in a ProcessPoolExecutor, so CPU-bound
+    model code never blocks the event loop.
+
+    One dispatcher task per pool process takes jobs off the queue, so the
+    pool never has more work queued internally than it can run and the
+    queue bound is what callers see. Credits are held when a job is
+    submitted, captured when it succeeds and released when it fails. The
+    hold lives for CREDIT_HOLD_TTL_SECONDS plus the job's expected wait and
+    run time; if it expires anyway, the job is charged directly and fails
+    if the balance no longer covers it.
+
+    Jobs are kept in memory by the process that accepted them, for
+    JOB_RESULT_TTL_SECONDS after they finish.
+    """
+
+    def __init__(self, workers: int, max_queue: int, result_ttl: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.jobs: dict[uuid.UUID, Job] = {}
+        self._finished: deque = deque()
+        self._queue: asyncio.Queue | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._run_seconds: dict[str, float] = {}  # op -> moving average of run time
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def hold_ttl(self, op: str) -> int:
+        """Hold lifetime for a job queued now: the TTL margin plus its expected wait and run time."""
+        rounds = self.depth() // self.workers + 1
+        return settings.CREDIT_HOLD_TTL_SECONDS + math.ceil(rounds * self._run_seconds.get(op, 0.0))
+
+    def start(self):
+        """Start the worker pool and dispatchers. Call from the app lifespan."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the dispatchers and pool, releasing the holds of jobs still queued."""
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            await self._fail(job, "Server shutting down")
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def submit(self, db: AsyncSession, user_id: str, op: str, text: str) -> Job:
+        """
+        Queue a job, holding its credits first. Cached results complete the
+        job immediately at the cache-hit price.
+
+        Raises:
+            QueueFullError: If the queue is full
+            InsufficientCreditsError: If the balance does not cover the job
+        """
+        self._prune()
+        if self._queue.full():
+            raise QueueFullError("Job queue is full")
+
+        fn, cost = JOB_OPERATIONS[op]
+        job = Job(id=uuid.uuid4(), user_id=user_id, op=op, text=text)
+
+        cached = await result_cache.get(op, text)
+        if cached is not None:
+            price = hit_cost(cost)
+            if price:
+                await deduct_credits(db, user_id, price, f"{op}_cached")
+            job.result = cached
+            job.started_at = job.finished_at = time.time()
+            job.set_status(SUCCEEDED)
+            self.jobs[job.id] = job
+            self._finished.append(job)
+            return job
+
+        job.hold_id = await place_hold(db, user_id, cost, op, ttl_seconds=self.hold_ttl(op))
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await release_hold(db, job.hold_id)
+            raise QueueFullError("Job queue is full")
+
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: uuid.UUID, user_id: str) -> Job | None:
+        """Return the job if it exists and belongs to the user."""
+        job = self.jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def _dispatch(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # One job's failure must never stop this dispatcher
+                logger.exception("AI job dispatch failed", job_id=str(job.id), op=job.op)
+                if not job.finished:
+                    job.error = "Internal error"
+                    self._finish(job, FAILED)
+
+    async def _run(self, job: Job):
+        loop = asyncio.get_running_loop()
+        fn, cost = JOB_OPERATIONS[job.op]
+
+        job.started_at = time.time()
+        JOB_WAIT_SECONDS.labels(job.op).observe(job.started_at - job.created_at)
+        job.set_status(RUNNING)
+        try:
+            result = await loop.run_in_executor(self._pool, fn, job.text)
+        except asyncio.CancelledError:
+            await self._fail(job, "Server shutting down")
+            raise
+        except Exception as e:
+            logger.exception("AI job failed", job_id=str(job.id), op=job.op)
+            await self._fail(job, str(e) or type(e).__name__)
+            return
+
+        try:
+            async with async_session() as db:
+                try:
+                    await capture_hold(db, job.hold_id)
+                except HoldNotFoundError:
+                    # The job outlived its hold and the sweeper returned the
+                    # credits; charge them again directly
+                    logger.warning("AI job hold expired before capture", job_id=str(job.id))
+                    await deduct_credits(db, job.user_id, cost, job.op)
+        except InsufficientCreditsError:
+            job.error = "Insufficient credits"
+            self._finish(job, FAILED)
+            return
+        except Exception:
+            # Not charged, so not delivered either
+            logger.exception("AI job hold capture failed", job_id=str(job.id))
+            await self._fail(job, "Could not charge for the job")
+            return
+
+        try:
+            await result_cache.set(job.op, job.text, result)
+        except Exception as e:
+            # The cache is an optimization; the job still succeeded
+            logger.warning("AI job result not cached", job_id=str(job.id), error=str(e))
+
+        job.result = result
+        self._finish(job, SUCCEEDED)
+
+    async def _fail(self, job: Job, error: str):
+        try:
+            async with async_session() as db:
+                await release_hold(db, job.hold_id)
+        except HoldNotFoundError:
+            pass
+        except Exception:
+            # The sweeper returns the credits once the hold expires
+            logger.exception("AI job hold release failed", job_id=str(job.id))
+        job.error = error
+        self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str):
+        job.finished_at = time.time()
+        if job.started_at is not None:
+            run_seconds = job.finished_at - job.started_at
+            JOB_RUN_SECONDS.labels(job.op).observe(run_seconds)
+            if status == SUCCEEDED:
+                previous = self._run_seconds.get(job.op)
+                self._run_seconds[job.op] = run_seconds if previous is None else 0.8 * previous + 0.2 * run_seconds
+        JOBS_FINISHED.labels(job.op, status).inc()
+        job.set_status(status)
+        self._finished.append(job)
+
+    def _prune(self):
+        """Forget finished jobs older than the result TTL."""
+        cutoff = time.time() - self.result_ttl
+        while self._finished and self._finished[0].finished_at < cutoff:
+            self.jobs.pop(self._finished.popleft().id, None)
+
+
+async def job_events(job: Job, keepalive: float = 15.0) -> AsyncIterator[str]:
+    """
+    Server-sent events with the job's state: one event now and one per
+    status change, ending when the job finishes.
+    """
+    while True:
+        # Take the event before the snapshot, so no change is missed
+        changed = job.changed
+        yield f"data: {json.dumps(job.to_dict())}\n\n"
+        if job.finished:
+            return
+        while not changed.is_set():
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+
+# Create a single, reusable job queue from the settings
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_queue=settings.JOB_QUEUE_SIZE,
+    result_ttl=settings.JOB_RESULT_TTL_SECONDS
+)
+
+JOB_QUEUE_DEPTH.set_function(job_queue.depth)
@@ -1,6 +1,26 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from ..config import settings
+from .cache import TTLCache
+
+# Verified payloads keyed by a digest of the token
+_token_cache = TTLCache(
+    "token",
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+# Revoked token digests mapped to the token's exp (epoch seconds)
+_revoked_tokens: dict[bytes, float] = {}
+
+# Key the cached payloads were verified with
+_cache_secret = settings.SECRET_KEY
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
 
 
 def create_access_token(user_id: str, email: str) -> str:
@@ -27,15 +47,69 @@ def create_access_token(user_id: str, email: str) -> str:
 def verify_token(token: str) -> dict | None:
     """
     Verify and decode a JWT token.
-    
+
+    Tokens that already passed verification are served from an in-process
+    cache until their exp claim (or the cache TTL, whichever is sooner).
+
     Args:
         token: The JWT token string
-    
+
     Returns:
         Decoded payload if valid, None if invalid
     """
+    global _cache_secret
+
+    # A rotated key invalidates everything verified with the old one
+    if settings.SECRET_KEY != _cache_secret:
+        _token_cache.clear()
+        _cache_secret = settings.SECRET_KEY
+
+    digest = _token_digest(token)
+    if digest in _revoked_tokens:
+        return None
+
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload
     except JWTError:
         return None
+
+    exp = payload.get("exp")
+    if exp is not None:
+        _token_cache.set(digest, payload, ttl=exp - time.time())
+    return payload
+
+
+def revoke_token(token: str):
+    """
+    Reject a token from now on, even if its signature and exp are valid.
+
+    Revocations are kept in process memory until the token would have
+    expired anyway.
+
+    Args:
+        token: The JWT token string
+    """
+    digest = _token_digest(token)
+    _token_cache.invalidate(digest)
+
+    # Tokens without a readable exp stay revoked for the life of the process
+    now = time.time()
+    try:
+        claims = jwt.get_unverified_claims(token)
+        expires_at = float(claims.get("exp", float("inf")))
+    except JWTError:
+        expires_at = float("inf")
+    _revoked_tokens[digest] = expires_at
+
+    # Forget revocations for tokens that have expired on their own
+    for key in [k for k, exp in _revoked_tokens.items() if exp < now]:
+        del _revoked_tokens[key]
+
+
+def clear_token_cache():
+    """Drop every cached verification result."""
+    _token_cache.clear()
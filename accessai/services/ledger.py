@@ -0,0 +1,219 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+import structlog
+from prometheus_client import Counter, Gauge
+from sqlalchemy import insert
+from ..config import settings
+from ..database import async_session
+from ..models.credit import CreditTransaction, transaction_category
+
+logger = structlog.get_logger()
+
+# Prometheus metrics for the write-behind buffer
+LEDGER_QUEUE_DEPTH = Gauge(
+    "accessai_ledger_queue_depth",
+    "Credit transactions waiting to be flushed to the database"
+)
+LEDGER_FLUSH_SECONDS = Gauge(
+    "accessai_ledger_last_flush_seconds",
+    "Duration of the most recent ledger flush"
+)
+LEDGER_FLUSH_ROWS = Gauge(
+    "accessai_ledger_last_flush_rows",
+    "Number of rows written by the most recent ledger flush"
+)
+
+LEDGER_ROWS_UNWRITTEN = Counter(
+    "accessai_ledger_rows_unwritten_total",
+    "Ledger rows given up on after every flush attempt failed (their balance change is committed)"
+)
+
+# Backoff before the second flush attempt, doubled for each later one
+FLUSH_RETRY_SECONDS = 0.5
+
+# Marks the end of the queue during shutdown
+_STOP = object()
+
+
+class LedgerWriter:
+    """
+    Buffers CreditTransaction rows and writes them in bulk.
+
+    Modes:
+        sync:  the writer is bypassed and each service call inserts its own row
+               in the same transaction as the balance change.
+        group: rows are batched, but record() waits until its batch is flushed
+               (group commit), so the caller never returns before its row is
+               written. A crash loses at most the rows of the batch being
+               collected, whose balance changes are already committed.
+        async: record() returns as soon as the row is queued. At most
+               max_queue rows can be lost if the process dies before a flush.
+
+    In both buffered modes the balance change is committed before its row is
+    queued, so a flush error is never raised to the caller: the request has
+    already changed the balance. A failed batch is retried flush_attempts
+    times; after that its rows are logged in full (ledger_row_unwritten) and
+    counted in accessai_ledger_rows_unwritten_total, and the affected users
+    show up in `python -m accessai.cli.ledger_maintenance reconcile`.
+
+    A batch is flushed when it reaches batch_size rows or when flush_interval
+    seconds have passed since its first row, whichever comes first.
+
+    The flush loop runs between start() and stop(), normally the app
+    lifespan. Rows recorded while it is not running (scripts, the CLI) are
+    written directly, one INSERT per call, so none are left in a queue
+    nobody drains.
+    """
+
+    def __init__(self, mode: str, batch_size: int, flush_interval: float, max_queue: int, flush_attempts: int = 3):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.flush_attempts = max(1, flush_attempts)
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def buffered(self) -> bool:
+        """True when ledger rows go through the buffer instead of the request transaction."""
+        return self.mode != "sync"
+
+    def start(self):
+        """Start the background flush loop (no-op in sync mode)."""
+        if not self.buffered or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        logger.info("ledger_writer_started", mode=self.mode, batch_size=self.batch_size)
+
+    async def stop(self):
+        """Flush everything still queued and stop the background loop."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+        logger.info("ledger_writer_stopped")
+
+    async def record(self, user_id: uuid.UUID, amount: int, reason: str):
+        """
+        Queue one ledger row.
+
+        Args:
+            user_id: The user's UUID
+            amount: Positive for credits added, negative for credits spent
+            reason: Description of the transaction
+
+        In group mode this waits until the row's batch is flushed: committed,
+        or given up on and logged after flush_attempts failures. Flush errors
+        are not raised. In async mode it only waits if the queue is full.
+        When the writer is not started, the row is written before returning.
+        """
+        row = {
+            "user_id": user_id,
+            "amount": amount,
+            "reason": reason,
+            "category": transaction_category(amount, reason),
+            # Stamp now, not at flush time, so ordering matches the balance updates
+            "created_at": datetime.now(timezone.utc),
+        }
+        if self._task is None:
+            await self._flush([(row, None)])
+            return
+
+        waiter = asyncio.get_running_loop().create_future() if self.mode == "group" else None
+
+        await self._queue.put((row, waiter))
+        LEDGER_QUEUE_DEPTH.set(self._queue.qsize())
+
+        if waiter is not None:
+            await waiter
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+
+            # Block until the first row of the next batch arrives
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch.append(item)
+
+            # Then collect more rows until the batch is full or the window closes
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Drain anything that was queued behind the stop marker
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[i:i + self.batch_size])
+
+    async def _flush(self, batch: list):
+        rows = [row for row, _ in batch]
+        start = time.perf_counter()
+
+        for attempt in range(self.flush_attempts):
+            if attempt:
+                await asyncio.sleep(FLUSH_RETRY_SECONDS * 2 ** (attempt - 1))
+            try:
+                async with async_session() as db:
+                    # Executemany is sent as multi-row INSERT ... VALUES statements
+                    await db.execute(insert(CreditTransaction), rows)
+                    await db.commit()
+                break
+            except Exception as e:
+                logger.error("ledger_flush_failed", rows=len(rows), attempt=attempt + 1, error=str(e))
+        else:
+            # The balance changes are already committed; keep every row in the
+            # log so the ledger can be repaired during reconciliation
+            LEDGER_ROWS_UNWRITTEN.inc(len(rows))
+            for row in rows:
+                logger.error(
+                    "ledger_row_unwritten",
+                    user_id=str(row["user_id"]),
+                    amount=row["amount"],
+                    reason=row["reason"],
+                    category=row["category"],
+                    created_at=row["created_at"].isoformat(),
+                )
+
+        LEDGER_FLUSH_SECONDS.set(time.perf_counter() - start)
+        LEDGER_FLUSH_ROWS.set(len(rows))
+        if self._queue is not None:
+            LEDGER_QUEUE_DEPTH.set(self._queue.qsize())
+
+        for _, waiter in batch:
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+
+# Create a single, reusable ledger writer from the settings
+ledger_writer = LedgerWriter(
+    mode=settings.LEDGER_WRITE_MODE,
+    batch_size=settings.LEDGER_BATCH_SIZE,
+    flush_interval=settings.LEDGER_FLUSH_INTERVAL_MS / 1000,
+    max_queue=settings.LEDGER_MAX_QUEUE,
+    flush_attempts=settings.LEDGER_FLUSH_ATTEMPTS,
+)
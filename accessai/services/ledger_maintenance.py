@@ -0,0 +1,245 @@
+import re
+from datetime import date, datetime, timezone
+from prometheus_client import Gauge
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+# Monthly partitions are named credit_transactions_YYYY_MM (see migration v0005)
+PARTITION_NAME = re.compile(r"^credit_transactions_(\d{4})_(\d{2})$")
+
+# There is no DEFAULT partition: inserts fail once the current month has none
+PARTITION_MONTHS_AHEAD = Gauge(
+    "accessai_ledger_partition_months_ahead",
+    "Monthly credit_transactions partitions that exist after the current month (-1: none for this month)"
+)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _current_month() -> date:
+    # Partition bounds are UTC months
+    today = datetime.now(timezone.utc).date()
+    return date(today.year, today.month, 1)
+
+
+async def list_partitions(engine: AsyncEngine) -> list[tuple[date, str]]:
+    """
+    List the monthly credit_transactions partitions.
+
+    Returns:
+        List of (first day of month, partition table name), oldest first
+    """
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = 'credit_transactions'
+            """
+        ))
+        names = result.scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+async def ensure_partitions(engine: AsyncEngine, months_ahead: int = 2) -> list[str]:
+    """
+    Create monthly partitions from the current month through months_ahead.
+
+    Args:
+        engine: Database engine
+        months_ahead: Number of future months to create
+
+    Returns:
+        Names of the partitions that were created
+    """
+    partitions = await list_partitions(engine)
+    existing = {name for _, name in partitions}
+    months = {month for month, _ in partitions}
+    created = []
+
+    async with engine.begin() as conn:
+        for offset in range(months_ahead + 1):
+            month = _add_months(_current_month(), offset)
+            name = f"credit_transactions_{month:%Y_%m}"
+            if name in existing:
+                continue
+            await conn.execute(text("SELECT create_credit_transactions_partition(:month)"), {"month": month})
+            created.append(name)
+            months.add(month)
+
+    PARTITION_MONTHS_AHEAD.set(_months_covered(months))
+    return created
+
+
+def _months_covered(months: set[date]) -> int:
+    """Consecutive months with a partition after the current one, or -1 if it has none."""
+    month = _current_month()
+    if month not in months:
+        return -1
+    ahead = 0
+    while _add_months(month, ahead + 1) in months:
+        ahead += 1
+    return ahead
+
+
+async def partition_months_ahead(engine: AsyncEngine) -> int:
+    """
+    Check how far ahead the ledger partitions go, without creating any
+    (the app only reads the catalog; migrations and the CLI create them).
+
+    Returns:
+        Months with a partition after the current one, or -1 if the current month has none
+    """
+    months = {month for month, _ in await list_partitions(engine)}
+    ahead = _months_covered(months)
+    PARTITION_MONTHS_AHEAD.set(ahead)
+    return ahead
+
+
+async def list_detached_partitions(engine: AsyncEngine) -> list[tuple[date, str]]:
+    """
+    List monthly ledger tables that are no longer attached to
+    credit_transactions: detached for a rollup that hasn't finished yet.
+
+    Returns:
+        List of (first day of month, table name), oldest first
+    """
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            """
+            SELECT c.relname
+            FROM pg_class c
+            WHERE c.relkind = 'r'
+              AND c.relname ~ '^credit_transactions_[0-9]{4}_[0-9]{2}$'
+              AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+            """
+        ))
+        names = result.scalars().all()
+
+    detached = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        detached.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(detached)
+
+
+async def _detach_partition(engine: AsyncEngine, name: str):
+    """
+    Detach a partition without blocking the ledger. DETACH ... CONCURRENTLY
+    (PostgreSQL 14+) cannot run in a transaction block; one interrupted
+    half-way is left pending and completed with FINALIZE.
+    """
+    async with engine.connect() as conn:
+        pending = await conn.scalar(text(
+            """
+            SELECT i.inhdetachpending
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE c.relname = :name
+            """
+        ), {"name": name})
+
+    mode = "FINALIZE" if pending else "CONCURRENTLY"
+    autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+    async with autocommit.connect() as conn:
+        # Partition names come from the catalog and match PARTITION_NAME
+        await conn.execute(text(f'ALTER TABLE credit_transactions DETACH PARTITION "{name}" {mode}'))
+
+
+async def rollup_old_partitions(engine: AsyncEngine, retention_months: int) -> list[tuple[str, int]]:
+    """
+    Compact partitions older than the retention window into daily rollups.
+
+    Each partition is first detached concurrently, so ledger reads and writes
+    don't wait on it. The detached table is then summed into
+    credit_transaction_daily per user, day and reason and dropped, in a
+    single transaction that only locks that table. Tables left detached by an
+    interrupted run are rolled up by the next one; until then their rows are
+    in neither the ledger nor the rollups, so reconcile reports those users.
+
+    Compacted months are no longer in the ledger exports (only their daily
+    totals, in credit_transaction_daily).
+
+    Args:
+        engine: Database engine
+        retention_months: Number of whole months (before the current one) to keep as raw rows
+
+    Returns:
+        List of (partition name, rows compacted)
+    """
+    cutoff = _add_months(_current_month(), -retention_months)
+
+    for month, name in await list_partitions(engine):
+        if month >= cutoff:
+            break
+        await _detach_partition(engine, name)
+
+    compacted = []
+    for month, name in await list_detached_partitions(engine):
+        if month >= cutoff:
+            continue
+
+        async with engine.begin() as conn:
+            rows = await conn.scalar(text(f'SELECT count(*) FROM "{name}"'))
+            await conn.execute(text(
+                f"""
+                INSERT INTO credit_transaction_daily
+                    (user_id, day, reason, category, amount, transaction_count)
+                SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, reason,
+                       min(category), sum(amount), count(*)
+                FROM "{name}"
+                GROUP BY user_id, (created_at AT TIME ZONE 'UTC')::date, reason
+                ON CONFLICT (user_id, day, reason) DO UPDATE SET
+                    amount = credit_transaction_daily.amount + excluded.amount,
+                    transaction_count = credit_transaction_daily.transaction_count + excluded.transaction_count
+                """
+            ))
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+        compacted.append((name, rows))
+
+    return compacted
+
+
+async def find_unreconciled(db: AsyncSession, limit: int = 100) -> list:
+    """
+    Find users whose balance differs from their ledger plus rollups.
+    Credits in active holds are already off the balance but not yet in the
+    ledger, so they are added back before comparing.
+
+    Args:
+        db: Database session
+        limit: Maximum number of users to return
+
+    Returns:
+        List of rows (user_id, balance, ledger_total)
+    """
+    result = await db.execute(text(
+        """
+        SELECT uc.user_id, uc.balance + coalesce(holds.total, 0) AS balance,
+               coalesce(ledger.total, 0) + coalesce(rollup.total, 0) AS ledger_total
+        FROM user_credits uc
+        LEFT JOIN (
+            SELECT user_id, sum(amount) AS total FROM credit_transactions GROUP BY user_id
+        ) ledger ON ledger.user_id = uc.user_id
+        LEFT JOIN (
+            SELECT user_id, sum(amount) AS total FROM credit_transaction_daily GROUP BY user_id
+        ) rollup ON rollup.user_id = uc.user_id
+        LEFT JOIN (
+            SELECT user_id, sum(amount) AS total FROM credit_holds GROUP BY user_id
+        ) holds ON holds.user_id = uc.user_id
+        WHERE uc.balance + coalesce(holds.total, 0)
+              <> coalesce(ledger.total, 0) + coalesce(rollup.total, 0)
+        LIMIT :limit
+        """
+    ), {"limit": limit})
+    return result.all()
@@ -1,14 +1,139 @@
-from authlib.integrations.starlette_client import OAuth
+import asyncio
+import re
+import time
+from functools import cache
+import structlog
+from prometheus_client import Gauge
 from ..config import settings
 
-# Create OAuth instance
-oauth = OAuth()
+logger = structlog.get_logger()
 
-# Register Google OAuth
-oauth.register(
-    name='google',
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'},
+GOOGLE_DISCOVERY_URL = 'https://accounts.google.com/.well-known/openid-configuration'
+
+# Refresh once this share of the TTL has passed, well before it runs out
+REFRESH_AHEAD = 0.8
+
+
+@cache
+def google_client():
+    """
+    The Google OAuth client, created on first use so authlib is only
+    imported once someone logs in. Call from a running event loop: it also
+    starts the metadata refresher if startup didn't (FAST_STARTUP). Authlib
+    fetches the discovery document itself only if the cache hasn't loaded it.
+    """
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name='google',
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        server_metadata_url=GOOGLE_DISCOVERY_URL,
+        client_kwargs={'scope': 'openid email profile'},
+    )
+    google_metadata.attach(oauth.google)
+    google_metadata.start()
+    return oauth.google
+
+
+def max_age(response) -> int | None:
+    """max-age from the Cache-Control header, if any."""
+    match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+    return int(match.group(1)) if match else None
+
+
+class OIDCMetadataCache:
+    """
+    Keeps an OpenID discovery document and JWKS loaded for an OAuth client.
+
+    Both are fetched in the background from startup (or the first login in
+    FAST_STARTUP mode) and refreshed
+    ahead of expiry (the TTL is the provider's Cache-Control max-age, capped
+    at `ttl`), so no login waits on discovery or key fetches. A failed
+    refresh keeps serving the previous values and is retried.
+    """
+
+    def __init__(self, metadata_url: str, ttl: float, retry_interval: float, timeout: float = 10):
+        """
+        Args:
+            metadata_url: OpenID discovery URL
+            ttl: Longest time between refreshes, in seconds
+            retry_interval: Seconds between attempts after a failed refresh
+            timeout: Seconds allowed per HTTP request
+        """
+        self.client = None
+        self.metadata: dict = {}
+        self.metadata_url = metadata_url
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.loaded_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def attach(self, client):
+        """Fill in the authlib client's server_metadata, now and on every refresh."""
+        self.client = client
+        client.server_metadata.update(self.metadata)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> float:
+        """
+        Fetch the discovery document and JWKS and swap them in together.
+
+        Returns:
+            Seconds until the next refresh is due
+        """
+        import httpx
+
+        async with httpx.AsyncClient(timeout=self.timeout) as http:
+            response = await http.get(self.metadata_url)
+            response.raise_for_status()
+            metadata = response.json()
+            ttl = min(self.ttl, max_age(response) or self.ttl)
+
+            jwks_response = await http.get(metadata["jwks_uri"])
+            jwks_response.raise_for_status()
+            jwks = jwks_response.json()
+            ttl = min(ttl, max_age(jwks_response) or ttl)
+
+        # authlib reads these keys: "_loaded_at" stops it fetching the
+        # document itself, "jwks" is used to verify id tokens
+        metadata["jwks"] = jwks
+        metadata["_loaded_at"] = time.time()
+        self.metadata = metadata
+        if self.client is not None:
+            self.client.server_metadata.update(metadata)
+        self.loaded_at = time.time()
+        logger.info("OIDC metadata loaded", url=self.metadata_url, keys=len(jwks.get("keys", [])), ttl=ttl)
+        return ttl * REFRESH_AHEAD
+
+    async def _run(self):
+        while True:
+            try:
+                delay = await self.refresh()
+            except Exception as e:
+                logger.warning("OIDC metadata refresh failed", url=self.metadata_url, error=str(e))
+                delay = self.retry_interval
+            await asyncio.sleep(delay)
+
+
+google_metadata = OIDCMetadataCache(
+    GOOGLE_DISCOVERY_URL,
+    ttl=settings.OIDC_METADATA_TTL_SECONDS,
+    retry_interval=settings.OIDC_METADATA_RETRY_SECONDS
 )
+
+Gauge(
+    "accessai_oidc_metadata_age_seconds",
+    "Seconds since the OpenID discovery document and JWKS were refreshed (-1 before the first load)"
+).set_function(lambda: -1 if google_metadata.loaded_at is None else time.time() - google_metadata.loaded_at)
@@ -0,0 +1,238 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from ..config import settings
+
+# Seconds per unit in limit strings such as "20/minute"
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$")
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A token bucket: up to `capacity` requests, refilled evenly over `period` seconds."""
+    capacity: int
+    period: float
+    text: str
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_limit(text: str) -> Limit:
+    """
+    Parse a limit string like "20/minute" or "100 per hour".
+
+    Raises:
+        ValueError: If the string is not a valid limit
+    """
+    match = _LIMIT_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {text!r}")
+    return Limit(int(match.group(1)), _PERIODS[match.group(2)], text)
+
+
+def _refill_and_take(tokens: float, updated: float, now: float, limit: Limit, cost: int):
+    """
+    Token bucket step shared by the in-process storages.
+
+    Returns:
+        Tuple of (tokens left, allowed, seconds until enough tokens)
+    """
+    tokens = min(limit.capacity, tokens + max(0.0, now - updated) * limit.refill_rate)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / limit.refill_rate
+
+
+class MemoryStorage:
+    """
+    Per-process token buckets. Each worker enforces its own limit, so use it
+    for a single worker or as a local stand-in for the shared storages in tests.
+    """
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> tuple[bool, float]:
+        now = time.time()
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        tokens, allowed, retry_after = _refill_and_take(tokens, updated, now, limit, cost)
+        self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+    async def close(self):
+        pass
+
+
+class SharedMemoryStorage:
+    """
+    Token buckets in a memory-mapped file shared by every worker on the host.
+
+    The file is a fixed-size open-addressing hash table of
+    (key hash, tokens, last update) slots, and each check holds an exclusive
+    flock for the few microseconds it takes, so concurrent workers can never
+    both spend the last token. When every slot in a key's probe window is
+    taken, the least recently updated one is reused; an idle bucket is likely
+    full anyway.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+    MAX_PROBE = 16
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def _hit(self, key: str, limit: Limit, cost: int) -> tuple[bool, float]:
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            now = time.time()
+            target, oldest, oldest_updated = None, None, None
+            for probe in range(self.MAX_PROBE):
+                slot = (start + probe) % self.slots
+                stored_hash, tokens, updated = self.SLOT.unpack_from(self._map, slot * self.SLOT.size)
+                if stored_hash == key_hash:
+                    target = slot
+                    break
+                if stored_hash == 0:
+                    target, tokens, updated = slot, limit.capacity, now
+                    break
+                if oldest is None or updated < oldest_updated:
+                    oldest, oldest_updated = slot, updated
+            else:
+                target, tokens, updated = oldest, limit.capacity, now
+
+            tokens, allowed, retry_after = _refill_and_take(tokens, updated, now, limit, cost)
+            self.SLOT.pack_into(self._map, target * self.SLOT.size, key_hash, tokens, now)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, retry_after
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> tuple[bool, float]:
+        return self._hit(key, limit, cost)
+
+    async def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+# Atomic token bucket; state is a hash {t: tokens, u: last update} per key
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisStorage:
+    """
+    Token buckets in Redis, shared by every worker on every host. Each check
+    is one round trip running a Lua script, so it is atomic on the server.
+    Requires the optional redis package.
+    """
+
+    def __init__(self, url: str, prefix: str = "accessai:ratelimit:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[limit.capacity, limit.refill_rate, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def default_shm_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "accessai-ratelimit")
+
+
+def create_storage(kind: str):
+    """
+    Build the rate-limit storage selected by RATE_LIMIT_STORAGE.
+
+    Args:
+        kind: "memory", "shm" or "redis"
+    """
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "shm":
+        return SharedMemoryStorage(settings.RATE_LIMIT_SHM_PATH or default_shm_path(), settings.RATE_LIMIT_SHM_SLOTS)
+    if kind == "redis":
+        return RedisStorage(settings.RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"Unknown rate limit storage: {kind}")
+
+
+class RateLimiter:
+    """
+    Checks token buckets in the configured storage. Tests can swap in a
+    MemoryStorage by assigning rate_limiter.storage.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> tuple[bool, float]:
+        """
+        Take `cost` tokens from the bucket for `key`.
+
+        Returns:
+            Tuple of (allowed, seconds to wait before retrying)
+        """
+        return await self.storage.hit(key, limit, cost)
+
+    async def close(self):
+        await self.storage.close()
+
+
+# Create a single, reusable rate limiter from the settings
+rate_limiter = RateLimiter(create_storage(settings.RATE_LIMIT_STORAGE))
@@ -0,0 +1,80 @@
+import queue
+import random
+import threading
+import structlog
+from prometheus_client import Counter, Gauge
+from ..config import settings
+
+logger = structlog.get_logger()
+
+REQUEST_LOGS_DROPPED = Counter(
+    "accessai_request_logs_dropped_total",
+    "Request log lines dropped because the log queue was full"
+)
+REQUEST_LOG_QUEUE_DEPTH = Gauge(
+    "accessai_request_log_queue_depth",
+    "Request log lines waiting to be written"
+)
+
+# Marks the end of the queue during shutdown
+_STOP = object()
+
+
+class RequestLogWriter:
+    """
+    Writes request log lines from a background thread.
+
+    The event loop only appends to a bounded queue; rendering and writing
+    the JSON lines happen in the writer thread. When the queue is full the
+    line is dropped and counted instead of slowing requests down. 2xx
+    responses are logged with probability `success_sample_rate`; every other
+    status is always logged.
+    """
+
+    def __init__(self, max_queue: int, success_sample_rate: float):
+        self.success_sample_rate = success_sample_rate
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        REQUEST_LOG_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def start(self):
+        """Start the writer thread (also started by the first log call)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Write everything still queued and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def log(self, method: str, path: str, status: int, duration_ms: float):
+        """Queue one request line, subject to sampling. Never blocks."""
+        if 200 <= status < 300 and self.success_sample_rate < 1 and random.random() >= self.success_sample_rate:
+            return
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((method, path, status, duration_ms))
+        except queue.Full:
+            REQUEST_LOGS_DROPPED.inc()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            method, path, status, duration_ms = item
+            logger.info("response", method=method, path=path, status=status, duration_ms=duration_ms)
+
+
+request_log_writer = RequestLogWriter(
+    max_queue=settings.REQUEST_LOG_MAX_QUEUE,
+    success_sample_rate=settings.REQUEST_LOG_SUCCESS_SAMPLE_RATE
+)
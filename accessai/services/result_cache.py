@@ -0,0 +1,135 @@
+import hashlib
+import json
+import unicodedata
+from prometheus_client import Gauge
+from ..config import settings
+from .cache import TTLCache, CACHE_REQUESTS
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, whitespace runs collapsed, trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def result_key(op: str, text: str, model_version: str) -> str:
+    """
+    Content address of an AI result: a hash of the operation, the model
+    version and the normalized input, so a new model never serves old results.
+    """
+    material = "\0".join((op, model_version, normalize_text(text)))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class RedisResultStore:
+    """
+    Shared result tier in Redis, seen by every worker on every host.
+    Requires the optional redis package.
+    """
+
+    def __init__(self, url: str, prefix: str = "accessai:result:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get_many(self, keys: list[str]) -> list[dict | None]:
+        values = await self._client.mget([self.prefix + key for key in keys])
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def set_many(self, items: dict[str, dict], ttl: float):
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+            await pipe.execute()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class ResultCache:
+    """
+    Two-tier cache of AI results keyed by result_key().
+
+    Lookups go to the in-process LRU first, then to the shared tier if one
+    is configured; shared hits are copied into the local tier. Both tiers
+    expire entries after the TTL.
+    """
+
+    def __init__(self, model_version: str, maxsize: int, ttl: float, shared: RedisResultStore | None = None):
+        self.model_version = model_version
+        self.ttl = ttl
+        self.local = TTLCache("result", maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.shared_hits = 0
+
+    async def get(self, op: str, text: str) -> dict | None:
+        """Return the cached result of `op` on `text`, or None."""
+        return (await self.get_many(op, [text]))[0]
+
+    async def get_many(self, op: str, texts: list[str]) -> list[dict | None]:
+        """
+        Look up several texts at once; results are in input order, None for
+        misses. Local misses are fetched from the shared tier in one round trip.
+        """
+        keys = [result_key(op, text, self.model_version) for text in texts]
+        results = [self.local.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing or self.shared is None:
+            return results
+
+        shared = await self.shared.get_many([keys[i] for i in missing])
+        for i, result in zip(missing, shared):
+            CACHE_REQUESTS.labels("result_shared", "miss" if result is None else "hit").inc()
+            if result is not None:
+                self.shared_hits += 1
+                self.local.set(keys[i], result)
+                results[i] = result
+        return results
+
+    async def set(self, op: str, text: str, result: dict):
+        """Store the result of `op` on `text` in every tier."""
+        await self.set_many(op, {text: result})
+
+    async def set_many(self, op: str, results: dict[str, dict]):
+        """Store several results, keyed by input text, in every tier."""
+        items = {result_key(op, text, self.model_version): result for text, result in results.items()}
+        for key, result in items.items():
+            self.local.set(key, result)
+        if self.shared is not None and items:
+            await self.shared.set_many(items, self.ttl)
+
+    def hit_ratio(self) -> float:
+        """Fraction of lookups answered by either tier since startup."""
+        lookups = self.local.hits + self.local.misses
+        return (self.local.hits + self.shared_hits) / lookups if lookups else 0.0
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+
+def hit_cost(cost: int) -> int:
+    """Credits charged for a cached result, per RESULT_CACHE_HIT_COST_PERCENT."""
+    return cost * settings.RESULT_CACHE_HIT_COST_PERCENT // 100
+
+
+def _create_result_cache() -> ResultCache:
+    from .ai import MODEL_VERSION
+
+    shared = RedisResultStore(settings.RESULT_CACHE_REDIS_URL) if settings.RESULT_CACHE_REDIS_URL else None
+    return ResultCache(
+        MODEL_VERSION,
+        maxsize=settings.RESULT_CACHE_SIZE,
+        ttl=settings.RESULT_CACHE_TTL_SECONDS,
+        shared=shared
+    )
+
+
+# Create a single, reusable result cache from the settings
+result_cache = _create_result_cache()
+
+RESULT_CACHE_HIT_RATIO = Gauge(
+    "accessai_result_cache_hit_ratio",
+    "Fraction of AI result lookups served from cache since startup"
+)
+RESULT_CACHE_HIT_RATIO.set_function(result_cache.hit_ratio)
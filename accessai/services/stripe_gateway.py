@@ -0,0 +1,367 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import TYPE_CHECKING
+import structlog
+from prometheus_client import Gauge, Histogram
+from ..config import settings, CREDIT_PACKAGES
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = structlog.get_logger()
+
+STRIPE_REQUEST_SECONDS = Histogram(
+    "accessai_stripe_request_seconds",
+    "Latency of Stripe API calls, including retries",
+    ["operation", "outcome"]
+)
+
+# Backoff between retries: full jitter over an exponentially growing window
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 5.0
+
+
+class StripeError(Exception):
+    """Stripe rejected the request (4xx)."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StripeUnavailableError(StripeError):
+    """Stripe could not be reached, kept failing, or the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is down.
+
+    After `failure_threshold` consecutive failed calls the circuit opens and
+    calls are rejected without a request. Once `reset_timeout` seconds have
+    passed one probe call is let through (half-open); its success closes the
+    circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now."""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        # One probe at a time; a probe that never reported back (cancelled
+        # request) stops blocking others after reset_timeout
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_started = None
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("Stripe circuit opened", failures=self.failures)
+            self.opened_at = time.monotonic()
+
+
+def form_encode(params: dict, prefix: str = "") -> list[tuple[str, str]]:
+    """
+    Flatten nested params into Stripe's form encoding:
+    {"line_items": [{"price": "p"}]} -> [("line_items[0][price]", "p")].
+    None values are left out.
+    """
+    pairs = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            pairs.extend(form_encode(value, name))
+        elif isinstance(value, (list, tuple)):
+            pairs.extend(form_encode(dict(enumerate(value)), name))
+        elif isinstance(value, bool):
+            pairs.append((name, "true" if value else "false"))
+        else:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+def price_lookup_key(package_name: str, package: dict) -> str:
+    """
+    Stripe lookup key of a package's price. Credits and price are part of
+    the key, so changing a package in CREDIT_PACKAGES creates a new Price
+    instead of reusing a stale one.
+    """
+    return f"accessai_{package_name}_{package['credits']}c_{package['price_usd']}usd"
+
+
+class StripeGateway:
+    """
+    Async Stripe client for the calls made while serving requests.
+
+    Uses one pooled httpx client, so requests never block the event loop
+    and connections are reused. Network errors, 429 and 5xx are retried with
+    jittered backoff (POSTs carry an Idempotency-Key, so a retry never
+    creates a second object), and a circuit breaker fails fast while Stripe
+    is down. Package prices are looked up (or created) once and cached.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: float,
+        max_connections: int,
+        max_retries: int,
+        breaker: CircuitBreaker,
+        transport: "httpx.AsyncBaseTransport | None" = None
+    ):
+        """
+        Args:
+            api_key: Stripe secret key
+            base_url: Stripe API base URL (or a local stub)
+            timeout: Seconds allowed per attempt
+            max_connections: Size of the connection pool
+            max_retries: Retries after the first attempt
+            breaker: Circuit breaker shared by every call
+            transport: Optional httpx transport (e.g. an in-process stub)
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self.transport = transport
+        self._client: "httpx.AsyncClient | None" = None
+        self._prices: dict[str, str] = {}
+        self._price_lock = asyncio.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # Created on first use, inside the running event loop (httpx is
+        # only imported once Stripe is actually called)
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self.transport
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        operation: str = "",
+        idempotency_key: str | None = None,
+        retries: int | None = None
+    ) -> dict:
+        """
+        Make one Stripe API call, with retries.
+
+        Returns:
+            The decoded JSON response
+
+        Raises:
+            StripeUnavailableError: Circuit open, or every attempt failed
+            StripeError: Stripe rejected the request
+        """
+        if not self.breaker.allow():
+            STRIPE_REQUEST_SECONDS.labels(operation, "circuit_open").observe(0)
+            raise StripeUnavailableError("Stripe circuit open")
+
+        import httpx
+
+        client = self._get_client()
+        encoded = form_encode(params or {})
+        headers = {}
+        if method == "POST":
+            # Same key on every attempt: Stripe replays the first result
+            headers["Idempotency-Key"] = idempotency_key or str(uuid.uuid4())
+        retries = self.max_retries if retries is None else retries
+
+        start = time.perf_counter()
+        error: StripeError | None = None
+        for attempt in range(retries + 1):
+            if attempt:
+                window = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, window))
+            try:
+                if method == "GET":
+                    response = await client.get(path, params=encoded)
+                else:
+                    response = await client.post(path, data=dict(encoded), headers=headers)
+            except httpx.TransportError as e:
+                error = StripeUnavailableError(f"Stripe request failed: {type(e).__name__}")
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                error = StripeUnavailableError(f"Stripe returned {response.status_code}", response.status_code)
+                if response.headers.get("stripe-should-retry") == "false":
+                    break
+                continue
+
+            # Stripe answered: the service is up even if it rejected the request
+            self.breaker.record_success()
+            if response.status_code >= 400:
+                STRIPE_REQUEST_SECONDS.labels(operation, "rejected").observe(time.perf_counter() - start)
+                try:
+                    message = response.json()["error"]["message"]
+                except (ValueError, KeyError, TypeError):
+                    message = response.text
+                raise StripeError(message, response.status_code)
+            STRIPE_REQUEST_SECONDS.labels(operation, "ok").observe(time.perf_counter() - start)
+            return response.json()
+
+        self.breaker.record_failure()
+        STRIPE_REQUEST_SECONDS.labels(operation, "unavailable").observe(time.perf_counter() - start)
+        logger.warning("Stripe call failed", operation=operation, attempts=attempt + 1, error=str(error))
+        raise error
+
+    async def retrieve_account(self, retries: int | None = None) -> dict:
+        return await self._request("GET", "/v1/account", operation="account", retries=retries)
+
+    async def _load_prices(self, package_names: list[str]):
+        """Find each package's Price by lookup key, creating the missing ones."""
+        keys = {price_lookup_key(name, CREDIT_PACKAGES[name]): name for name in package_names}
+        found = await self._request(
+            "GET", "/v1/prices",
+            {"lookup_keys": list(keys), "active": True, "limit": 100},
+            operation="price_list"
+        )
+        for price in found.get("data", []):
+            name = keys.pop(price.get("lookup_key"), None)
+            if name is not None:
+                self._prices[name] = price["id"]
+
+        for lookup_key, name in keys.items():
+            package = CREDIT_PACKAGES[name]
+            price = await self._request(
+                "POST", "/v1/prices",
+                {
+                    "currency": "usd",
+                    "unit_amount": package["price_usd"] * 100,
+                    "lookup_key": lookup_key,
+                    "product_data": {"name": f"{package['credits']} Credits - {name.title()}"},
+                    "metadata": {"package_name": name, "credits": package["credits"]},
+                },
+                operation="price_create",
+                # Workers starting together create the Price only once
+                idempotency_key=f"price-{lookup_key}"
+            )
+            self._prices[name] = price["id"]
+            logger.info("Stripe price created", package_name=name, price_id=price["id"])
+
+    async def price_id(self, package_name: str) -> str:
+        """
+        Get the Stripe Price id of a credit package (cached after the first lookup).
+
+        Raises:
+            KeyError: If the package does not exist
+        """
+        price = self._prices.get(package_name)
+        if price is not None:
+            return price
+        if package_name not in CREDIT_PACKAGES:
+            raise KeyError(package_name)
+        async with self._price_lock:
+            if package_name not in self._prices:
+                await self._load_prices([package_name])
+            return self._prices[package_name]
+
+    async def warm_prices(self):
+        """Load every package's Price ahead of the first checkout. Failures are only logged."""
+        try:
+            async with self._price_lock:
+                missing = [name for name in CREDIT_PACKAGES if name not in self._prices]
+                if missing:
+                    await self._load_prices(missing)
+        except StripeError as e:
+            logger.warning("Could not load Stripe prices", error=str(e))
+
+    async def create_checkout_session(
+        self,
+        package_name: str,
+        success_url: str,
+        cancel_url: str,
+        customer_email: str | None = None,
+        client_reference_id: str | None = None,
+        metadata: dict | None = None
+    ) -> dict:
+        """
+        Create a Checkout Session for one credit package.
+
+        Returns:
+            The Checkout Session object (its "url" is the payment page)
+        """
+        price = await self.price_id(package_name)
+        return await self._request(
+            "POST", "/v1/checkout/sessions",
+            {
+                "mode": "payment",
+                "payment_method_types": ["card"],
+                "line_items": [{"price": price, "quantity": 1}],
+                "success_url": success_url,
+                "cancel_url": cancel_url,
+                "customer_email": customer_email,
+                "client_reference_id": client_reference_id,
+                "metadata": metadata,
+            },
+            operation="checkout_session"
+        )
+
+
+stripe_gateway = StripeGateway(
+    api_key=settings.STRIPE_SECRET_KEY,
+    base_url=settings.STRIPE_API_BASE,
+    timeout=settings.STRIPE_TIMEOUT_SECONDS,
+    max_connections=settings.STRIPE_MAX_CONNECTIONS,
+    max_retries=settings.STRIPE_MAX_RETRIES,
+    breaker=CircuitBreaker(settings.STRIPE_BREAKER_FAILURE_THRESHOLD, settings.STRIPE_BREAKER_RESET_SECONDS)
+)
+
+Gauge(
+    "accessai_stripe_circuit_open",
+    "1 while the Stripe circuit breaker rejects calls"
+).set_function(lambda: 1 if stripe_gateway.breaker.state == "open" else 0)
@@ -0,0 +1,192 @@
+import json
+import uuid
+from dataclasses import dataclass, field
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.types import Integer, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.credit import transaction_category
+
+REPLAY_REASON = "stripe_payment"
+
+
+@dataclass
+class CheckoutGrant:
+    """Credits bought in one completed checkout session."""
+    session_id: str
+    credits: int
+    user_id: uuid.UUID | None
+    email: str | None
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of a replay; every event read is counted in exactly one bucket."""
+    lines: int = 0
+    invalid: list = field(default_factory=list)
+    bad_signature: list = field(default_factory=list)
+    skipped_type: int = 0
+    duplicate_in_file: int = 0
+    already_recorded: int = 0
+    applied: int = 0
+    credits_granted: int = 0
+    unknown_user: list = field(default_factory=list)
+    dry_run: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "lines": self.lines,
+            "invalid": len(self.invalid),
+            "bad_signature": len(self.bad_signature),
+            "skipped_type": self.skipped_type,
+            "duplicate_in_file": self.duplicate_in_file,
+            "already_recorded": self.already_recorded,
+            "applied": self.applied,
+            "credits_granted": self.credits_granted,
+            "unknown_user": len(self.unknown_user),
+            "invalid_lines": self.invalid,
+            "bad_signature_lines": self.bad_signature,
+            "unknown_user_sessions": self.unknown_user,
+        }
+
+
+def parse_line(line: str) -> tuple[dict, str | None, str | None]:
+    """
+    Parse one line of the export. A line is either a Stripe event object,
+    or a captured delivery {"payload": "<raw body>", "signature": "<Stripe-Signature>"}.
+
+    Returns:
+        Tuple of (event, raw payload or None, signature header or None)
+
+    Raises:
+        ValueError: If the line is not valid JSON or not an event
+    """
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Not a JSON object")
+    if "payload" in record:
+        payload = record["payload"]
+        return json.loads(payload), payload, record.get("signature")
+    return record, None, None
+
+
+def verify_signature(args: tuple) -> bool:
+    """
+    Check a captured delivery's Stripe signature. Runs in a worker process,
+    hence the single tuple argument. The timestamp is not checked, since
+    replayed events are old by definition.
+    """
+    import stripe
+
+    payload, header, secret = args
+    if payload is None or header is None:
+        return False
+    try:
+        stripe.WebhookSignature.verify_header(payload, header, secret)
+        return True
+    except stripe.error.SignatureVerificationError:
+        return False
+
+
+def checkout_grant(event: dict) -> CheckoutGrant | None:
+    """
+    Extract the grant from a checkout.session.completed event, the same way
+    the webhook does. Returns None for other event types.
+
+    Raises:
+        ValueError: If the session has no credits, no customer or a bad user id
+    """
+    if event.get("type") != "checkout.session.completed":
+        return None
+    session = event["data"]["object"]
+    metadata = session.get("metadata") or {}
+    credits = int(metadata.get("credits", 0))
+    user_id = metadata.get("user_id")
+    email = (session.get("customer_details") or {}).get("email")
+    if not session.get("id") or not credits or not (user_id or email):
+        raise ValueError("Checkout session without credits or customer")
+    return CheckoutGrant(
+        session_id=session["id"],
+        credits=credits,
+        user_id=uuid.UUID(user_id) if user_id else None,
+        email=None if user_id else email,
+    )
+
+
+async def recorded_sessions(db: AsyncSession, session_ids: list[str]) -> set[str]:
+    """Return the session ids that already have a payments row."""
+    result = await db.execute(
+        text("SELECT stripe_session_id FROM payments WHERE stripe_session_id = ANY(:ids)")
+        .bindparams(bindparam("ids", type_=ARRAY(String))),
+        {"ids": session_ids}
+    )
+    return set(result.scalars().all())
+
+
+# Set-based version of services.credit.apply_payment for a whole batch:
+# the payments insert is still ON CONFLICT DO NOTHING, and balances and
+# ledger rows are only written for sessions that were inserted.
+_APPLY_BATCH = text(
+    """
+    WITH input AS (
+        SELECT * FROM unnest(:session_ids, :credits, :user_ids, :emails)
+            AS t(session_id, credits, user_id, email)
+    ),
+    resolved AS (
+        SELECT i.session_id, i.credits, u.id AS user_id, u.email
+        FROM input i JOIN users u ON u.id = i.user_id
+        UNION ALL
+        SELECT i.session_id, i.credits, u.id, u.email
+        FROM input i JOIN users u ON u.email = i.email
+        WHERE i.user_id IS NULL
+    ),
+    inserted AS (
+        INSERT INTO payments (stripe_session_id, user_email, credits)
+        SELECT session_id, email, credits FROM resolved
+        ON CONFLICT (stripe_session_id) DO NOTHING
+        RETURNING stripe_session_id
+    ),
+    applied AS (
+        SELECT r.* FROM resolved r JOIN inserted i ON i.stripe_session_id = r.session_id
+    ),
+    credited AS (
+        INSERT INTO user_credits (user_id, balance)
+        SELECT user_id, sum(credits) FROM applied GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET balance = user_credits.balance + EXCLUDED.balance, updated_at = now()
+    ),
+    logged AS (
+        INSERT INTO credit_transactions (user_id, amount, reason, category)
+        SELECT user_id, credits, :reason, :category FROM applied
+    )
+    SELECT
+        (SELECT coalesce(array_agg(session_id), '{}') FROM resolved) AS resolved,
+        (SELECT coalesce(array_agg(session_id), '{}') FROM applied) AS applied
+    """
+).bindparams(
+    bindparam("session_ids", type_=ARRAY(String)),
+    bindparam("credits", type_=ARRAY(Integer)),
+    bindparam("user_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("emails", type_=ARRAY(String)),
+)
+
+
+async def apply_grants(db: AsyncSession, grants: list[CheckoutGrant]) -> tuple[set[str], set[str]]:
+    """
+    Record and credit a batch of checkout sessions in one statement.
+    The caller commits (or rolls back for a dry run).
+
+    Returns:
+        Tuple of (session ids whose user was found, session ids applied)
+    """
+    result = await db.execute(_APPLY_BATCH, {
+        "session_ids": [g.session_id for g in grants],
+        "credits": [g.credits for g in grants],
+        "user_ids": [g.user_id for g in grants],
+        "emails": [g.email for g in grants],
+        "reason": REPLAY_REASON,
+        "category": transaction_category(1, REPLAY_REASON),
+    })
+    resolved, applied = result.one()
+    return set(resolved), set(applied)
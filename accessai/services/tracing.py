@@ -0,0 +1,73 @@
+import re
+import time
+from starlette.routing import compile_path
+
+# Transactions of requests that match no route share one budget
+UNMATCHED_ROUTE = "unmatched"
+
+
+class AdaptiveTraceSampler:
+    """
+    Sentry traces_sampler that keeps a per-route budget instead of one
+    global rate.
+
+    Each route template gets a token bucket refilled at `per_minute`
+    transactions per minute. While a route has tokens every request is
+    traced, so rarely hit routes are always visible; once a busy route has
+    spent its budget it is traced at the `floor` rate. Trace volume then
+    grows with the number of routes, not with traffic.
+    """
+
+    def __init__(self, per_minute: float, floor: float):
+        """
+        Args:
+            per_minute: Transactions traced at full rate per route per minute
+            floor: Sample rate for a route past its budget
+        """
+        self.capacity = max(per_minute, 1.0)
+        self.refill_per_second = per_minute / 60
+        self.floor = floor
+        self.app = None  # set once the app exists, to resolve route templates
+        self._buckets: dict[str, list[float]] = {}  # route -> [tokens, updated_at]
+        self._patterns: list[tuple[re.Pattern, str]] | None = None
+
+    def route_template(self, path: str) -> str:
+        """The app's route template matching a request path, e.g. /jobs/{job_id}."""
+        if self._patterns is None:
+            if self.app is None:
+                return UNMATCHED_ROUTE
+            # Routes are in declaration order, the order the router matches in
+            self._patterns = [(compile_path(template)[0], template) for template in self.app.openapi()["paths"]]
+        for pattern, template in self._patterns:
+            if pattern.match(path):
+                return template
+        return UNMATCHED_ROUTE
+
+    def take(self, route: str) -> bool:
+        """Spend one of the route's tokens, if it has any left."""
+        now = time.monotonic()
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = [self.capacity, now]
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def __call__(self, sampling_context: dict) -> float:
+        # Follow the caller's decision for distributed traces
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return 1.0 if parent_sampled else 0.0
+
+        scope = sampling_context.get("asgi_scope")
+        if scope is None:
+            # Not a request (background work): no per-route budget
+            return self.floor
+        if self.take(self.route_template(scope.get("path", ""))):
+            return 1.0
+        return self.floor
+
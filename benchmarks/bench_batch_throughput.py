@@ -0,0 +1,133 @@
+"""
+Throughput benchmark for the batch AI routes.
+Sends the same number of items to /credits/summarize (one item per request)
+and to /credits/summarize/batch (BATCH_SIZE items per request) through the
+ASGI app in-process, and compares items per second.
+
+Usage:
+    python -m benchmarks.bench_batch_throughput [ITEMS] [BATCH_SIZE] [CONCURRENCY]
+
+Requires DATABASE_URL (and the other required settings) to point at a
+migrated PostgreSQL database. The per-user rate limit is switched off for
+the run, otherwise the single-item route would stop after 20 requests.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import delete
+
+from accessai.database import engine, async_session
+from accessai.main import app
+from accessai.models.user import User
+from accessai.models.credit import UserCredit, CreditTransaction
+from accessai.services import ai
+from accessai.services.jwt import create_access_token
+from accessai.services.rate_limit import rate_limiter
+
+# Items sent through each route
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+# Items per batch request
+BATCH_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+# Requests in flight at once
+CONCURRENCY = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+TEXT = "The quick brown fox jumps over the lazy dog. " * 4
+
+
+class NoLimit:
+    """Rate-limit storage that admits everything."""
+
+    async def hit(self, key, limit, cost=1):
+        return True, 0.0
+
+    async def close(self):
+        pass
+
+
+async def seed_user() -> tuple[str, str]:
+    """Create a throwaway user with enough credits for both runs."""
+    async with async_session() as db:
+        user = User(
+            email=f"bench-{uuid.uuid4()}@example.com",
+            name="Benchmark User",
+            google_id=f"bench-{uuid.uuid4()}",
+        )
+        db.add(user)
+        await db.flush()
+        db.add(UserCredit(user_id=user.id, balance=2 * ITEMS * ai.SUMMARIZE_COST))
+        await db.commit()
+        return str(user.id), user.email
+
+
+async def cleanup_user(user_id: str):
+    """Remove the benchmark user and its ledger."""
+    user_uuid = uuid.UUID(user_id)
+    async with async_session() as db:
+        await db.execute(delete(CreditTransaction).where(CreditTransaction.user_id == user_uuid))
+        await db.execute(delete(UserCredit).where(UserCredit.user_id == user_uuid))
+        await db.execute(delete(User).where(User.id == user_uuid))
+        await db.commit()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(client: httpx.AsyncClient, path: str, bodies: list) -> tuple[float, list]:
+    """POST every body with CONCURRENCY requests in flight; return (seconds, latencies)."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def post(body):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(post(body) for body in bodies))
+    return time.perf_counter() - start, latencies
+
+
+async def main():
+    rate_limiter.storage = NoLimit()
+    user_id, email = await seed_user()
+    headers = {"Authorization": f"Bearer {create_access_token(user_id, email)}"}
+
+    single = [{"text": TEXT} for _ in range(ITEMS)]
+    batches = [
+        {"items": single[i:i + BATCH_SIZE], "mode": "all_or_nothing"}
+        for i in range(0, ITEMS, BATCH_SIZE)
+    ]
+
+    print(f"{ITEMS} items, batches of {BATCH_SIZE}, {CONCURRENCY} requests in flight")
+    print("-" * 50)
+    print(f"{'route':<26} {'items/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+                for path, bodies in (("/credits/summarize", single), ("/credits/summarize/batch", batches)):
+                    elapsed, latencies = await run(client, path, bodies)
+                    print(
+                        f"{path:<26} {ITEMS / elapsed:>9.0f} "
+                        f"{statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f}"
+                    )
+    finally:
+        await cleanup_user(user_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Concurrency benchmark for credit deduction.
+Fires many concurrent deduct_credits calls at a single user and checks
+that no credits are double-spent, then reports per-call latency.
+
+Usage:
+    python -m benchmarks.bench_deduct_credits [NUM_CALLS]
+
+Requires DATABASE_URL (and the other required settings) to point at a
+PostgreSQL database.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import select, func, delete
+
+from accessai.database import engine, async_session, Base
+from accessai.models.user import User
+from accessai.models.credit import UserCredit, CreditTransaction
+from accessai.models import payment  # noqa: F401  (register table)
+from accessai.services.credit import deduct_credits, InsufficientCreditsError
+
+# Number of concurrent deductions
+NUM_CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+# Cost of each deduction
+COST = 10
+
+# Starting balance covers only half of the calls
+START_BALANCE = (NUM_CALLS // 2) * COST
+
+
+async def seed_user() -> str:
+    """Create a throwaway user with START_BALANCE credits."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        user = User(
+            email=f"bench-{uuid.uuid4()}@example.com",
+            name="Benchmark User",
+            google_id=f"bench-{uuid.uuid4()}",
+        )
+        db.add(user)
+        await db.flush()
+        db.add(UserCredit(user_id=user.id, balance=START_BALANCE))
+        await db.commit()
+        return str(user.id)
+
+
+async def cleanup_user(user_id: str):
+    """Remove the benchmark user and its ledger."""
+    user_uuid = uuid.UUID(user_id)
+    async with async_session() as db:
+        await db.execute(delete(CreditTransaction).where(CreditTransaction.user_id == user_uuid))
+        await db.execute(delete(UserCredit).where(UserCredit.user_id == user_uuid))
+        await db.execute(delete(User).where(User.id == user_uuid))
+        await db.commit()
+
+
+async def one_call(user_id: str, latencies: list) -> bool:
+    """Run a single deduction in its own session and time it."""
+    async with async_session() as db:
+        start = time.perf_counter()
+        try:
+            await deduct_credits(db, user_id, COST, "benchmark")
+            ok = True
+        except InsufficientCreditsError:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        return ok
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main():
+    user_id = await seed_user()
+    latencies = []
+
+    print(f"Running {NUM_CALLS} concurrent deductions of {COST} credits")
+    print(f"Starting balance: {START_BALANCE}")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_call(user_id, latencies) for _ in range(NUM_CALLS)))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(results)
+    rejected = NUM_CALLS - succeeded
+
+    # Check final state against what should have happened
+    user_uuid = uuid.UUID(user_id)
+    async with async_session() as db:
+        balance = (await db.execute(
+            select(UserCredit.balance).where(UserCredit.user_id == user_uuid)
+        )).scalar_one()
+        ledger_total = (await db.execute(
+            select(func.coalesce(func.sum(CreditTransaction.amount), 0))
+            .where(CreditTransaction.user_id == user_uuid)
+        )).scalar_one()
+
+    await cleanup_user(user_id)
+    await engine.dispose()
+
+    print("Results:")
+    print(f"  Succeeded:      {succeeded}")
+    print(f"  Rejected (402): {rejected}")
+    print(f"  Final balance:  {balance}")
+    print(f"  Ledger total:   {ledger_total}")
+    print(f"  Throughput:     {NUM_CALLS / elapsed:.0f} calls/s")
+    print(f"  Latency p50:    {statistics.median(latencies):.2f} ms")
+    print(f"  Latency p99:    {percentile(latencies, 99):.2f} ms")
+    print()
+
+    expected_successes = START_BALANCE // COST
+    consistent = (
+        succeeded == expected_successes
+        and balance == START_BALANCE - succeeded * COST
+        and ledger_total == -succeeded * COST
+    )
+    if consistent:
+        print("✅ No double-spend: balance and ledger agree")
+    else:
+        print("❌ Inconsistent balance or ledger detected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,287 @@
+"""
+Microbenchmarks for the credit service and JWT hot functions.
+Runs each function many times in a row against a throwaway user and
+reports, per call:
+
+  round trips   statements sent to PostgreSQL, plus BEGIN, COMMIT and
+                ROLLBACK (each is one network round trip)
+  wall time     median and p95, including opening and closing the session
+  allocations   peak memory allocated by Python during the call (tracemalloc,
+                measured in a separate pass so it doesn't slow the timing)
+
+Round trips don't depend on the machine, so they are compared exactly:
+with --compare, a function making more round trips than in the saved
+results fails the run (exit status 1) and lists the statements it ran.
+Wall time and allocation changes are shown for information.
+
+Usage:
+    python -m benchmarks.bench_hot_paths [--iterations N] [--output FILE] [--compare FILE]
+
+Requires DATABASE_URL (and the other required settings) to point at a
+migrated PostgreSQL database. Each call uses its own session, as a request
+does.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, event
+
+from accessai.database import engine, async_session, QueryStats, current_query_stats
+from accessai.models.user import User
+from accessai.models.credit import UserCredit, CreditTransaction, CreditDailyRollup, CreditHold
+from accessai.services.credit import (
+    add_credits,
+    deduct_credits,
+    get_user_credits,
+    get_user_transactions,
+    add_credits_by_email,
+)
+from accessai.services.jwt import create_access_token, verify_token, clear_token_cache
+from accessai.services.ledger import ledger_writer
+
+# Starting balance; large enough that deductions never run out
+START_BALANCE = 1_000_000_000
+
+# Ledger rows seeded so get_user_transactions reads a full page
+SEED_TRANSACTIONS = 20
+
+
+@dataclass
+class Case:
+    """One benchmarked function: `call` is sync, or async taking a session."""
+    name: str
+    call: Callable
+    uses_db: bool = True
+    setup: Callable | None = None  # run before each call, outside the measurement
+
+
+# Transaction control round trips, counted while a call runs
+transaction_events = Counter()
+
+
+def count_event(name: str):
+    def listener(*args):
+        transaction_events[name] += 1
+    return listener
+
+
+for _name in ("begin", "commit", "rollback"):
+    event.listen(engine.sync_engine, _name, count_event(_name))
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed_user() -> tuple[str, str]:
+    async with async_session() as db:
+        user = User(
+            email=f"bench-{uuid.uuid4()}@example.com",
+            name="Benchmark User",
+            google_id=f"bench-{uuid.uuid4()}",
+        )
+        db.add(user)
+        await db.flush()
+        db.add(UserCredit(user_id=user.id, balance=START_BALANCE))
+        db.add_all(
+            CreditTransaction(user_id=user.id, amount=1, reason="microbench_seed", category="grant")
+            for _ in range(SEED_TRANSACTIONS)
+        )
+        await db.commit()
+        return str(user.id), user.email
+
+
+async def cleanup_user(user_id: str):
+    user_uuid = uuid.UUID(user_id)
+    async with async_session() as db:
+        for model in (CreditHold, CreditTransaction, CreditDailyRollup, UserCredit):
+            await db.execute(delete(model).where(model.user_id == user_uuid))
+        await db.execute(delete(User).where(User.id == user_uuid))
+        await db.commit()
+
+
+def build_cases(user_id: str, email: str) -> list[Case]:
+    token = create_access_token(user_id, email)
+    return [
+        Case("add_credits", lambda db: add_credits(db, user_id, 1, "microbench")),
+        Case("deduct_credits", lambda db: deduct_credits(db, user_id, 1, "microbench")),
+        Case("get_user_credits", lambda db: get_user_credits(db, user_id)),
+        Case("get_user_transactions", lambda db: get_user_transactions(db, user_id, limit=10)),
+        Case("add_credits_by_email", lambda db: add_credits_by_email(db, email, 1, "microbench")),
+        Case("create_access_token", lambda: create_access_token(user_id, email), uses_db=False),
+        Case("verify_token (cold)", lambda: verify_token(token), uses_db=False, setup=clear_token_cache),
+        Case("verify_token (cached)", lambda: verify_token(token), uses_db=False),
+    ]
+
+
+async def call_once(case: Case):
+    if not case.uses_db:
+        return case.call()
+    async with async_session() as db:
+        result = case.call(db)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+async def measure(case: Case, iterations: int, warmup: int) -> dict:
+    """Round trips, wall time and allocations per call of one case."""
+    for _ in range(warmup):
+        if case.setup:
+            case.setup()
+        await call_once(case)
+
+    # Timing pass, counting round trips
+    durations = []
+    round_trips = []
+    statements = Counter()
+    for _ in range(iterations):
+        if case.setup:
+            case.setup()
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        transaction_events.clear()
+        start = time.perf_counter()
+        try:
+            await call_once(case)
+        finally:
+            durations.append(time.perf_counter() - start)
+            current_query_stats.reset(token)
+        round_trips.append(len(stats.durations) + sum(transaction_events.values()))
+        statements.update(stats.statements)
+
+    # Allocation pass
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            if case.setup:
+                case.setup()
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await call_once(case)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "round_trips": round(statistics.mean(round_trips), 2),
+        "statements": {" ".join(s.split())[:160]: round(n / iterations, 2) for s, n in statements.most_common()},
+        "median_us": round(statistics.median(durations) * 1e6, 1),
+        "p95_us": round(percentile(durations, 95) * 1e6, 1),
+        "alloc_kib": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def change(current: float, previous: float) -> str:
+    if not previous:
+        return ""
+    return f"{(current - previous) / previous:+.0%}"
+
+
+def compare(results: dict, previous: dict) -> bool:
+    """Print the changes against earlier results; False if any round trips were added."""
+    print(f"Compared with {previous.get('commit') or 'earlier run'}:")
+    ok = True
+    for name, current in results["functions"].items():
+        before = previous.get("functions", {}).get(name)
+        if before is None:
+            continue
+        line = (
+            f"  {name:<24} round trips {before['round_trips']:g} -> {current['round_trips']:g}   "
+            f"median {change(current['median_us'], before['median_us']):>5}   "
+            f"alloc {change(current['alloc_kib'], before['alloc_kib']):>5}"
+        )
+        if current["round_trips"] > before["round_trips"]:
+            ok = False
+            print(f"{line}   ❌")
+            for statement, count in current["statements"].items():
+                marker = "+" if count > before["statements"].get(statement, 0) else " "
+                print(f"      {marker} {count:g}x {statement}")
+        else:
+            print(line)
+    return ok
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the credit service and JWT hot functions")
+    parser.add_argument("--iterations", type=int, default=200, help="Measured calls per function (default: 200)")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured calls first (default: 20)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare against")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    ledger_writer.start()
+    user_id, email = await seed_user()
+
+    print(f"{args.iterations} calls per function")
+    print("-" * 50)
+    print(f"{'function':<24} {'round trips':>11} {'median':>11} {'p95':>11} {'alloc':>10}")
+
+    functions = {}
+    try:
+        for case in build_cases(user_id, email):
+            result = await measure(case, args.iterations, args.warmup)
+            functions[case.name] = result
+            print(
+                f"{case.name:<24} {result['round_trips']:>11g} {result['median_us']:>8.1f} us "
+                f"{result['p95_us']:>8.1f} us {result['alloc_kib']:>6.1f} KiB"
+            )
+    finally:
+        await ledger_writer.stop()
+        await cleanup_user(user_id)
+        await engine.dispose()
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "functions": functions,
+    }
+    print("-" * 50)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if not compare(results, previous):
+            print("❌ Round trips added to a hot path")
+            sys.exit(1)
+        print("✅ No round trips added")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
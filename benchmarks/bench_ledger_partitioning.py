@@ -0,0 +1,171 @@
+"""
+History query benchmark: flat vs. monthly-partitioned credit ledger.
+Loads the same synthetic ledger (spread over 24 months) into a flat table
+and into a table range-partitioned by month, then times the balance page's
+"last 10 transactions" query and a deep keyset page for random users.
+
+Usage:
+    python -m benchmarks.bench_ledger_partitioning [ROWS ...]
+
+Defaults to 1,000,000 and 10,000,000 rows. Uses scratch schemas
+(bench_flat, bench_partitioned) in the DATABASE_URL database and drops
+them afterwards.
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from accessai.database import engine
+
+# Ledger sizes to benchmark
+SIZES = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000]
+
+# Average transactions per user
+ROWS_PER_USER = 1000
+
+# Months of history in the synthetic ledger
+MONTHS = 24
+
+# Queries timed per scenario
+QUERIES = 500
+
+COLUMNS = """
+    id BIGSERIAL,
+    user_id UUID NOT NULL,
+    amount INTEGER NOT NULL,
+    reason VARCHAR NOT NULL,
+    category VARCHAR NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+"""
+
+LAST_10 = """
+    SELECT id, amount, reason, created_at FROM {table}
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT 10
+"""
+
+# A keyset page roughly a year back in the user's history, shaped like
+# services.credit.get_transactions_page
+DEEP_PAGE = """
+    SELECT id, amount, reason, created_at FROM {table}
+    WHERE user_id = :user_id
+      AND (created_at, id) < (CAST(:cursor AS TIMESTAMPTZ), 0)
+      AND created_at <= CAST(:cursor AS TIMESTAMPTZ)
+    ORDER BY created_at DESC, id DESC
+    LIMIT 10
+"""
+
+
+def user_uuid(n: int) -> uuid.UUID:
+    return uuid.UUID(int=n)
+
+
+def month_start(offset: int) -> date:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def create_tables(conn):
+    await conn.execute(text("DROP SCHEMA IF EXISTS bench_flat CASCADE"))
+    await conn.execute(text("DROP SCHEMA IF EXISTS bench_partitioned CASCADE"))
+    await conn.execute(text("CREATE SCHEMA bench_flat"))
+    await conn.execute(text("CREATE SCHEMA bench_partitioned"))
+
+    await conn.execute(text(f"CREATE TABLE bench_flat.ledger ({COLUMNS}, PRIMARY KEY (id))"))
+    await conn.execute(text(
+        f"CREATE TABLE bench_partitioned.ledger ({COLUMNS}, PRIMARY KEY (id, created_at)) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    for offset in range(-MONTHS, 2):
+        start, end = month_start(offset), month_start(offset + 1)
+        await conn.execute(text(
+            f"CREATE TABLE bench_partitioned.ledger_{start:%Y_%m} PARTITION OF bench_partitioned.ledger "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+
+
+async def load(conn, rows: int, users: int):
+    # Same rows in both tables: user derived from the row number, random timestamp
+    generate = f"""
+        SELECT ('00000000-0000-0000-0000-' || lpad(to_hex(g % {users}), 12, '0'))::uuid,
+               -1, 'summarize', 'usage',
+               now() - random() * interval '{MONTHS * 30 - 1} days'
+        FROM generate_series(1, {rows}) g
+    """
+    for schema in ("bench_flat", "bench_partitioned"):
+        await conn.execute(text(
+            f"INSERT INTO {schema}.ledger (user_id, amount, reason, category, created_at) {generate}"
+        ))
+        await conn.execute(text(
+            f"CREATE INDEX ON {schema}.ledger (user_id, created_at DESC, id DESC)"
+        ))
+        await conn.execute(text(f"ANALYZE {schema}.ledger"))
+
+
+async def time_query(sql: str, users: int) -> list:
+    latencies = []
+    cursor = datetime.now(timezone.utc) - timedelta(days=365)
+    async with engine.connect() as conn:
+        # Warm up caches and the prepared statement
+        for _ in range(20):
+            await conn.execute(text(sql), {"user_id": user_uuid(random.randrange(users)), "cursor": cursor})
+        for _ in range(QUERIES):
+            params = {"user_id": user_uuid(random.randrange(users)), "cursor": cursor}
+            start = time.perf_counter()
+            await conn.execute(text(sql), params)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def bench_size(rows: int):
+    users = max(1, rows // ROWS_PER_USER)
+    print(f"Loading {rows:,} rows for {users:,} users over {MONTHS} months...")
+
+    start = time.perf_counter()
+    async with engine.begin() as conn:
+        await create_tables(conn)
+        await load(conn, rows, users)
+    print(f"  loaded in {time.perf_counter() - start:.1f}s")
+
+    print(f"  {'query':<12} {'table':<12} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, sql in (("last 10", LAST_10), ("deep page", DEEP_PAGE)):
+        for schema in ("bench_flat", "bench_partitioned"):
+            latencies = await time_query(sql.format(table=f"{schema}.ledger"), users)
+            name = schema.replace("bench_", "")
+            print(
+                f"  {label:<12} {name:<12} "
+                f"{statistics.median(latencies):>8.3f} {percentile(latencies, 99):>8.3f}"
+            )
+
+
+async def main():
+    print("Ledger history query latency, flat vs. partitioned")
+    print("-" * 50)
+    try:
+        for rows in SIZES:
+            await bench_size(rows)
+            print()
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA IF EXISTS bench_flat CASCADE"))
+            await conn.execute(text("DROP SCHEMA IF EXISTS bench_partitioned CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Micro-batching benchmark: latency vs. throughput of the inference scheduler.
+Runs closed-loop clients (each sends its next item as soon as the previous
+one returns) through a MicroBatcher with different batching windows and
+reports throughput and p50/p99 latency per item.
+
+Two backends are measured:
+  simulated  an inference server that runs one call at a time, each
+             costing CALL_MS plus ITEM_MS per item, so batching
+             amortizes the per-call cost
+  fake       the current fake summarizer, which shows the scheduler's own
+             overhead
+
+Usage:
+    python -m benchmarks.bench_micro_batching [CLIENTS] [ITEMS_PER_CLIENT]
+
+Does not need a database; placeholder settings are used if none are set.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+
+from accessai.services import ai  # noqa: E402
+from accessai.services.batching import MicroBatcher  # noqa: E402
+
+# Concurrent clients
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+# Items each client sends
+ITEMS = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+# Simulated backend cost: fixed per call, plus per item
+CALL_MS = 2.0
+ITEM_MS = 0.05
+
+# (max batch size, max wait ms); size 1 means no batching
+CONFIGS = [(1, 0), (8, 1), (32, 1), (32, 5), (64, 5), (64, 10)]
+
+TEXT = "The quick brown fox jumps over the lazy dog. " * 4
+
+
+async def simulated_backend(texts: list) -> list:
+    # One model instance: calls queue up behind each other
+    async with simulated_backend.lock:
+        await asyncio.sleep((CALL_MS + ITEM_MS * len(texts)) / 1000)
+    return ai.summarize_many(texts)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(backend, max_batch: int, max_wait_ms: float) -> tuple[float, list]:
+    batcher = MicroBatcher("bench", backend, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+    latencies = []
+
+    async def client():
+        for _ in range(ITEMS):
+            start = time.perf_counter()
+            await batcher.submit(TEXT)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(CLIENTS)))
+    return CLIENTS * ITEMS / (time.perf_counter() - start), latencies
+
+
+async def main():
+    simulated_backend.lock = asyncio.Lock()
+    print(f"{CLIENTS} clients x {ITEMS} items")
+    for name, backend in (("simulated", simulated_backend), ("fake", ai.summarize_many)):
+        print("-" * 50)
+        if name == "simulated":
+            print(f"Backend: simulated ({CALL_MS} ms per call + {ITEM_MS} ms per item)")
+        else:
+            print("Backend: fake summarizer")
+        print(f"{'max batch':>9} {'wait ms':>8} {'items/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for max_batch, max_wait_ms in CONFIGS:
+            throughput, latencies = await run(backend, max_batch, max_wait_ms)
+            print(
+                f"{max_batch:>9} {max_wait_ms:>8} {throughput:>9.0f} "
+                f"{statistics.median(latencies):>8.3f} {percentile(latencies, 99):>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
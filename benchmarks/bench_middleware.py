@@ -0,0 +1,159 @@
+"""
+Middleware stack benchmark: requests per second before and after.
+Builds two apps with the same trivial JSON route and CORS:
+
+  before  the previous stack: SessionMiddleware on every route plus two
+          @app.middleware("http") functions (request logging with two
+          synchronous log lines, security headers)
+  after   RequestMiddleware (headers, timing and queued logging in one pure
+          ASGI pass) with sessions on /auth only
+
+and drives each in-process through httpx.ASGITransport with concurrent
+clients. Log lines go to /dev/null so terminal speed doesn't matter; the
+JSON rendering and writes still happen.
+
+Usage:
+    python -m benchmarks.bench_middleware [REQUESTS] [CONCURRENCY]
+
+Does not need a database; placeholder settings are used if none are set.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+
+import httpx  # noqa: E402
+import structlog  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from starlette.middleware.sessions import SessionMiddleware  # noqa: E402
+
+from accessai.middleware import RequestMiddleware, PathSessionMiddleware  # noqa: E402
+from accessai.services.request_log import RequestLogWriter  # noqa: E402
+
+# Total requests per run
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+# Concurrent clients
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+structlog.configure(
+    processors=[
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.JSONRenderer()
+    ],
+    logger_factory=structlog.PrintLoggerFactory(file=open(os.devnull, "w"))
+)
+logger = structlog.get_logger()
+
+
+def add_routes(app: FastAPI) -> FastAPI:
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+    return app
+
+
+def add_cors(app: FastAPI):
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://localhost:8080"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+
+def before_app() -> FastAPI:
+    app = add_routes(FastAPI())
+    app.add_middleware(SessionMiddleware, secret_key="benchmark-secret-key")
+    add_cors(app)
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        logger.info("request", method=request.method, path=request.url.path)
+        response = await call_next(request)
+        duration = (time.time() - start_time) * 1000
+        logger.info(
+            "response",
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code,
+            duration_ms=round(duration, 2)
+        )
+        return response
+
+    @app.middleware("http")
+    async def add_security_headers(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        return response
+
+    return app
+
+
+def after_app(writer: RequestLogWriter) -> FastAPI:
+    app = add_routes(FastAPI())
+    app.add_middleware(PathSessionMiddleware, prefix="/auth", secret_key="benchmark-secret-key")
+    add_cors(app)
+    app.add_middleware(RequestMiddleware, log_writer=writer)
+    return app
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(app: FastAPI) -> tuple[float, list]:
+    latencies = []
+    remaining = iter(range(REQUESTS))
+
+    async def client(http: httpx.AsyncClient):
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await http.get("/ping", headers={"Origin": "http://localhost:3000"})
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        # Warm up
+        for _ in range(50):
+            await http.get("/ping")
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(CONCURRENCY)))
+        return REQUESTS / (time.perf_counter() - start), latencies
+
+
+async def main():
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent clients")
+    print("-" * 50)
+    print(f"{'stack':<24} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+    runs = [("before", before_app(), None)]
+    for rate in (1.0, 0.1):
+        writer = RequestLogWriter(max_queue=10000, success_sample_rate=rate)
+        runs.append((f"after (2xx sampled {rate:g})", after_app(writer), writer))
+
+    for name, app, writer in runs:
+        throughput, latencies = await run(app)
+        print(f"{name:<24} {throughput:>8.0f} {statistics.median(latencies):>8.3f} {percentile(latencies, 99):>8.3f}")
+        if writer is not None:
+            writer.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
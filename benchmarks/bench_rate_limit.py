@@ -0,0 +1,112 @@
+"""
+Rate-limit storage benchmark.
+Measures the cost of one token-bucket check for each storage, with several
+worker processes sharing the bucket file, and checks that workers sharing
+one bucket never admit more requests than its capacity.
+
+Usage:
+    python -m benchmarks.bench_rate_limit [WORKERS] [CHECKS_PER_WORKER] [--redis]
+
+--redis also benchmarks RATE_LIMIT_REDIS_URL (needs the redis package and
+a running server). Does not need a database.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+os.environ.setdefault("RATE_LIMIT_STORAGE", "memory")
+
+from accessai.config import settings  # noqa: E402
+from accessai.services.rate_limit import (  # noqa: E402
+    MemoryStorage, SharedMemoryStorage, RedisStorage, parse_limit
+)
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+WORKERS = int(args[0]) if len(args) > 0 else 4
+CHECKS = int(args[1]) if len(args) > 1 else 20000
+USE_REDIS = "--redis" in sys.argv
+
+SHM_PATH = os.path.join(tempfile.gettempdir(), f"accessai-ratelimit-bench-{os.getpid()}")
+SHM_SLOTS = 65536
+
+# Generous limit for the cost test, tiny one for the shared-bucket test
+COST_LIMIT = parse_limit("1000000/second")
+SHARED_LIMIT = parse_limit("500/day")
+
+
+def make_storage(kind: str):
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "shm":
+        return SharedMemoryStorage(SHM_PATH, SHM_SLOTS)
+    return RedisStorage(settings.RATE_LIMIT_REDIS_URL, prefix=f"bench:{os.getppid()}:")
+
+
+async def run_checks(kind: str, worker: int, shared_key: bool) -> tuple[float, int]:
+    storage = make_storage(kind)
+    limit = SHARED_LIMIT if shared_key else COST_LIMIT
+    allowed_count = 0
+    start = time.perf_counter()
+    for i in range(CHECKS):
+        # Many distinct users, or everyone on one user's bucket
+        key = "shared" if shared_key else f"user-{worker}-{i % 1000}"
+        allowed, _ = await storage.hit(f"/credits/summarize:{key}", limit)
+        allowed_count += allowed
+    elapsed = time.perf_counter() - start
+    await storage.close()
+    return elapsed / CHECKS * 1e6, allowed_count
+
+
+def worker_main(kind: str, worker: int, shared_key: bool, results):
+    results.put(asyncio.run(run_checks(kind, worker, shared_key)))
+
+
+def run_workers(kind: str, workers: int, shared_key: bool) -> tuple[float, int]:
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(kind, w, shared_key, results))
+        for w in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    mean_us = sum(us for us, _ in outcomes) / len(outcomes)
+    return mean_us, sum(allowed for _, allowed in outcomes)
+
+
+def main():
+    kinds = ["memory", "shm"] + (["redis"] if USE_REDIS else [])
+
+    print(f"{CHECKS} checks per worker")
+    print("-" * 50)
+    print(f"{'storage':<8} {'workers':>7} {'us/check':>9} {'shared bucket admitted':>24}")
+
+    try:
+        for kind in kinds:
+            # Per-process storage cannot be shared, so only run it in one worker
+            for workers in ([1] if kind == "memory" else [1, WORKERS]):
+                if kind == "shm" and os.path.exists(SHM_PATH):
+                    os.remove(SHM_PATH)
+                cost_us, _ = run_workers(kind, workers, shared_key=False)
+                if kind == "shm" and os.path.exists(SHM_PATH):
+                    os.remove(SHM_PATH)
+                _, admitted = run_workers(kind, workers, shared_key=True)
+                ok = "✅" if admitted == SHARED_LIMIT.capacity else "❌"
+                print(f"{kind:<8} {workers:>7} {cost_us:>9.2f} {admitted:>12} of {SHARED_LIMIT.capacity} {ok}")
+    finally:
+        if os.path.exists(SHM_PATH):
+            os.remove(SHM_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Startup benchmark: import time and time to first /livez response.
+Each measurement runs in a fresh interpreter:
+
+  import    python -c "import accessai.main"
+  /livez    uvicorn accessai.main:app, polled until /livez answers 200,
+            timed from process start
+
+The /livez run is repeated with FAST_STARTUP off and on, against the
+configured database and against an unreachable one (where the default
+mode cannot start at all, since it checks the schema before serving).
+
+Usage:
+    python -m benchmarks.bench_startup [RUNS]
+
+Requires DATABASE_URL (and the other required settings) to point at a
+migrated PostgreSQL database.
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Runs of each measurement
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+# Give up on a server that isn't serving after this long
+START_TIMEOUT = 30
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UNREACHABLE_DATABASE_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/accessai"
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import accessai.main; print(time.perf_counter() - t)"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def measure_first_livez(env: dict) -> float | None:
+    """Milliseconds from process start to the first 200 from /livez, or None."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "accessai.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < START_TIMEOUT:
+            if server.poll() is not None:
+                return None  # exited during startup
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/livez", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        return None
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(values: list) -> str:
+    done = [v for v in values if v is not None]
+    if not done:
+        return "did not start"
+    text = f"median {statistics.median(done):7.0f} ms   min {min(done):7.0f} ms"
+    if len(done) < len(values):
+        text += f"   ({len(values) - len(done)} failed)"
+    return text
+
+
+def main():
+    print(f"{RUNS} runs each")
+    print("-" * 50)
+    imports = [measure_import() for _ in range(RUNS)]
+    print(f"{'import accessai.main':<34} {summary(imports)}")
+    print("-" * 50)
+
+    scenarios = [
+        ("/livez, default startup", {"FAST_STARTUP": "false"}),
+        ("/livez, FAST_STARTUP", {"FAST_STARTUP": "true"}),
+        ("/livez, default, DB down", {"FAST_STARTUP": "false", "DATABASE_URL": UNREACHABLE_DATABASE_URL}),
+        ("/livez, FAST_STARTUP, DB down", {"FAST_STARTUP": "true", "DATABASE_URL": UNREACHABLE_DATABASE_URL}),
+    ]
+    for name, overrides in scenarios:
+        env = {**os.environ, **overrides}
+        results = [measure_first_livez(env) for _ in range(RUNS)]
+        print(f"{name:<34} {summary(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Stripe client benchmark: blocking SDK vs. the async gateway.
+Serves the local Stripe stub over HTTP (with simulated latency) and sends
+concurrent checkout-session calls from coroutines, as the checkout route
+does, first through the synchronous stripe SDK and then through
+StripeGateway. A ticker task measures how long the event loop was stalled.
+Then simulates an outage to show the circuit breaker failing fast.
+
+Usage:
+    python -m benchmarks.bench_stripe_gateway [CALLS] [LATENCY_MS]
+
+Does not need a database or a Stripe account; placeholder settings are
+used if none are set.
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+
+import stripe  # noqa: E402
+import uvicorn  # noqa: E402
+
+from accessai.services.stripe_gateway import StripeGateway, CircuitBreaker, StripeError  # noqa: E402
+from benchmarks.stripe_stub import create_stub_app  # noqa: E402
+
+# Concurrent checkout calls
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+# Simulated Stripe latency per request
+LATENCY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+API_KEY = "sk_test_stub"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(call) -> tuple[float, list, float]:
+    """Run CALLS concurrent calls; return (elapsed s, latencies ms, max loop stall ms)."""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append((time.perf_counter() - start) * 1000 - 5)
+
+    latencies = []
+
+    async def timed():
+        start = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(CALLS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return elapsed, latencies, max(stalls, default=0)
+
+
+def report(name: str, elapsed: float, latencies: list, stall: float):
+    print(f"{name}:")
+    print(f"  Total:          {elapsed * 1000:.0f} ms ({CALLS / elapsed:.0f} calls/s)")
+    print(f"  Latency p50:    {statistics.median(latencies):.1f} ms")
+    print(f"  Latency p99:    {percentile(latencies, 99):.1f} ms")
+    print(f"  Max loop stall: {stall:.1f} ms")
+
+
+async def main():
+    stub = create_stub_app(latency_ms=LATENCY_MS)
+    port = free_port()
+    server = start_stub(stub, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    gateway = StripeGateway(
+        api_key=API_KEY,
+        base_url=base_url,
+        timeout=5,
+        max_connections=CALLS,
+        max_retries=2,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    )
+    metadata = {"package_name": "starter", "credits": "200", "user_id": "bench"}
+
+    print(f"{CALLS} concurrent checkout calls, stub latency {LATENCY_MS:.0f} ms")
+    print("-" * 50)
+
+    # Before: the synchronous SDK called from the async route, with inline price_data
+    stripe.api_key = API_KEY
+    stripe.api_base = base_url
+
+    async def sdk_checkout():
+        stripe.checkout.Session.create(
+            payment_method_types=["card"],
+            line_items=[{
+                "price_data": {
+                    "currency": "usd",
+                    "product_data": {"name": "200 Credits - Starter"},
+                    "unit_amount": 900,
+                },
+                "quantity": 1,
+            }],
+            mode="payment",
+            success_url="http://localhost:8000/payments/success",
+            cancel_url="http://localhost:8000/payments/cancel",
+            metadata=metadata,
+        )
+
+    report("Sync stripe SDK", *await measure(sdk_checkout))
+    print("-" * 50)
+
+    # After: the async gateway with the cached package Price
+    async def gateway_checkout():
+        await gateway.create_checkout_session(
+            "starter",
+            success_url="http://localhost:8000/payments/success",
+            cancel_url="http://localhost:8000/payments/cancel",
+            metadata=metadata,
+        )
+
+    await gateway.warm_prices()
+    report("Async gateway", *await measure(gateway_checkout))
+    print("-" * 50)
+
+    # Outage: every request fails until the breaker opens
+    stub.state.error_rate = 1.0
+    requests_before = stub.state.requests
+    outcomes = []
+    for _ in range(10):
+        start = time.perf_counter()
+        try:
+            await gateway.retrieve_account()
+            outcome = "ok"
+        except StripeError as e:
+            outcome = str(e)
+        outcomes.append((outcome, (time.perf_counter() - start) * 1000))
+
+    print("Outage (every request returns 500), 10 sequential calls:")
+    for i, (outcome, ms) in enumerate(outcomes, start=1):
+        print(f"  call {i:>2}: {ms:>8.1f} ms  {outcome}")
+    print(f"  Requests that reached Stripe: {stub.state.requests - requests_before}")
+    print(f"  Breaker state:  {gateway.breaker.state}")
+
+    await gateway.close()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
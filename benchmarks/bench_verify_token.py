@@ -0,0 +1,66 @@
+"""
+Microbenchmark for JWT verification.
+Compares the cost of verify_token on a cold cache (full decode and HMAC
+check every call) against a warm cache (same token seen before).
+
+Usage:
+    python -m benchmarks.bench_verify_token [ITERATIONS]
+
+Does not need a database; placeholder settings are used if none are set.
+"""
+
+import os
+import sys
+import time
+import uuid
+
+# Only SECRET_KEY matters here, but Settings requires the rest
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+
+from accessai.services.jwt import create_access_token, verify_token, clear_token_cache  # noqa: E402
+
+# Number of verifications per scenario
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+
+def bench_cold(token: str) -> float:
+    """Average microseconds per call with the cache emptied before each call."""
+    total = 0.0
+    for _ in range(ITERATIONS):
+        clear_token_cache()
+        start = time.perf_counter()
+        verify_token(token)
+        total += time.perf_counter() - start
+    return total / ITERATIONS * 1e6
+
+
+def bench_warm(token: str) -> float:
+    """Average microseconds per call once the token is cached."""
+    verify_token(token)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        verify_token(token)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    token = create_access_token(str(uuid.uuid4()), "bench@example.com")
+    assert verify_token(token) is not None
+
+    print(f"Verifying one token {ITERATIONS} times per scenario")
+    print("-" * 50)
+
+    cold = bench_cold(token)
+    warm = bench_warm(token)
+
+    print("Results:")
+    print(f"  Cold (decode + HMAC): {cold:.2f} us/call")
+    print(f"  Warm (cache hit):     {warm:.2f} us/call")
+    print(f"  Speedup:              {cold / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Stripe webhook replay test.
+Signs checkout.session.completed events locally and delivers every event
+several times concurrently to /payments/webhook (as Stripe retries do),
+then checks that each session was credited exactly once.
+
+Usage:
+    python -m benchmarks.bench_webhook_replay [SESSIONS] [DUPLICATES]
+
+Requires DATABASE_URL (and the other required settings) to point at a
+migrated PostgreSQL database. Uses STRIPE_WEBHOOK_SECRET if set, otherwise
+a placeholder secret; no request reaches Stripe.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+os.environ.setdefault("STRIPE_WEBHOOK_SECRET", "whsec_replay_test")
+
+import httpx  # noqa: E402
+from sqlalchemy import select, func, delete  # noqa: E402
+
+from accessai.config import settings  # noqa: E402
+from accessai.database import engine, async_session  # noqa: E402
+from accessai.main import app  # noqa: E402
+from accessai.models.user import User  # noqa: E402
+from accessai.models.credit import UserCredit, CreditTransaction  # noqa: E402
+from accessai.models.payment import Payment  # noqa: E402
+
+# Distinct checkout sessions
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+# Deliveries of each session's event
+DUPLICATES = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+# Credits per session
+CREDITS = 100
+
+
+def sign(payload: bytes, secret: str) -> str:
+    """Build a Stripe-Signature header for the payload."""
+    timestamp = int(time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_event(session_id: str, user_id: str) -> bytes:
+    return json.dumps({
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "data": {
+            "object": {
+                "id": session_id,
+                "object": "checkout.session",
+                "metadata": {"credits": str(CREDITS), "user_id": user_id, "package_name": "starter"},
+            }
+        },
+    }).encode()
+
+
+async def seed_user() -> str:
+    async with async_session() as db:
+        user = User(
+            email=f"bench-{uuid.uuid4()}@example.com",
+            name="Benchmark User",
+            google_id=f"bench-{uuid.uuid4()}",
+        )
+        db.add(user)
+        await db.commit()
+        return str(user.id)
+
+
+async def cleanup(user_id: str, session_ids: list):
+    user_uuid = uuid.UUID(user_id)
+    async with async_session() as db:
+        await db.execute(delete(Payment).where(Payment.stripe_session_id.in_(session_ids)))
+        await db.execute(delete(CreditTransaction).where(CreditTransaction.user_id == user_uuid))
+        await db.execute(delete(UserCredit).where(UserCredit.user_id == user_uuid))
+        await db.execute(delete(User).where(User.id == user_uuid))
+        await db.commit()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main():
+    user_id = await seed_user()
+    session_ids = [f"cs_replay_{uuid.uuid4().hex}" for _ in range(SESSIONS)]
+    deliveries = [sid for sid in session_ids for _ in range(DUPLICATES)]
+    random.shuffle(deliveries)
+
+    print(f"Delivering {SESSIONS} sessions x {DUPLICATES} duplicates concurrently")
+    print("-" * 50)
+
+    statuses = {}
+    latencies = []
+
+    async def deliver(client: httpx.AsyncClient, session_id: str):
+        payload = checkout_event(session_id, user_id)
+        headers = {"stripe-signature": sign(payload, settings.STRIPE_WEBHOOK_SECRET), "content-type": "application/json"}
+        start = time.perf_counter()
+        response = await client.post("/payments/webhook", content=payload, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        key = f"{response.status_code} {response.json().get('status', response.text)}"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+                start = time.perf_counter()
+                await asyncio.gather(*(deliver(client, sid) for sid in deliveries))
+                elapsed = time.perf_counter() - start
+
+        user_uuid = uuid.UUID(user_id)
+        async with async_session() as db:
+            balance = (await db.execute(
+                select(UserCredit.balance).where(UserCredit.user_id == user_uuid)
+            )).scalar_one_or_none() or 0
+            ledger_rows = (await db.execute(
+                select(func.count()).where(CreditTransaction.user_id == user_uuid)
+            )).scalar_one()
+            payment_rows = (await db.execute(
+                select(func.count()).where(Payment.stripe_session_id.in_(session_ids))
+            )).scalar_one()
+    finally:
+        await cleanup(user_id, session_ids)
+        await engine.dispose()
+
+    print("Responses:")
+    for key, count in sorted(statuses.items()):
+        print(f"  {key:<28} {count}")
+    print(f"  Throughput:     {len(deliveries) / elapsed:.0f} deliveries/s")
+    print(f"  Latency p50:    {statistics.median(latencies):.2f} ms")
+    print(f"  Latency p99:    {percentile(latencies, 99):.2f} ms")
+    print(f"  Payment rows:   {payment_rows}")
+    print(f"  Ledger rows:    {ledger_rows}")
+    print(f"  Final balance:  {balance}")
+    print()
+
+    if payment_rows == SESSIONS and ledger_rows == SESSIONS and balance == SESSIONS * CREDITS:
+        print("✅ Every session credited exactly once")
+    else:
+        print("❌ Duplicate or missing credit grants")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
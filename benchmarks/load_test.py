@@ -0,0 +1,342 @@
+"""
+HTTP load test for the API hot paths.
+Seeds throwaway users with large balances, mints their JWTs with
+create_access_token, and drives each scenario for a fixed time with a
+pool of concurrent httpx clients:
+
+  balance     GET  /credits/balance
+  me          GET  /users/me
+  summarize   POST /credits/summarize   (unique text, so no cache hits)
+  analyze     POST /credits/analyze     (unique text, so no cache hits)
+  webhook     POST /payments/webhook    (checkout.session.completed, signed locally)
+
+Requests rotate over the seeded users. /credits/summarize and
+/credits/analyze are rate limited per user, so seed enough users for the
+target rate or the run will count 429s (reported as rate_limited, not
+errors).
+
+Reports requests/s and p50/p95/p99 latency per scenario, optionally saves
+the results as JSON, and exits with status 1 when a run regresses against
+a baseline file by more than the tolerance (or has errors where the
+baseline had none).
+
+Usage:
+    python -m benchmarks.load_test [--url URL] [--concurrency N] [--duration S]
+        [--users N] [--scenarios balance,me,...] [--output FILE]
+        [--baseline FILE] [--save-baseline] [--tolerance 0.15]
+
+Without --url the app runs in-process (httpx.ASGITransport); with --url it
+targets a running server, which must share this environment's DATABASE_URL,
+SECRET_KEY and STRIPE_WEBHOOK_SECRET (from the environment or .env). Webhooks
+are signed with STRIPE_WEBHOOK_SECRET; only in-process runs fall back to a
+placeholder secret when it is unset. No request reaches Stripe.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import delete, insert
+
+from accessai.config import settings
+from accessai.database import engine, async_session
+from accessai.models.user import User
+from accessai.models.credit import UserCredit, CreditTransaction, CreditDailyRollup, CreditHold
+from accessai.models.payment import Payment
+from accessai.services.jwt import create_access_token
+
+SCENARIOS = ["balance", "me", "summarize", "analyze", "webhook"]
+
+# Balance of each seeded user; enough that no run runs out of credits
+SEED_BALANCE = 1_000_000_000
+
+# Credits granted by each webhook event
+WEBHOOK_CREDITS = 1
+
+# Signs webhooks for in-process runs when STRIPE_WEBHOOK_SECRET is unset
+PLACEHOLDER_WEBHOOK_SECRET = "whsec_load_test"
+
+# Latency regressions smaller than this are noise, whatever the tolerance
+LATENCY_SLACK_MS = 1.0
+
+TEXT = "Load test input for the summarizer and analyzer, request number {n}."
+
+
+def sign(payload: bytes, secret: str) -> str:
+    """Build a Stripe-Signature header for the payload."""
+    timestamp = int(time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_event(session_id: str, user_id: str) -> bytes:
+    return json.dumps({
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "data": {
+            "object": {
+                "id": session_id,
+                "object": "checkout.session",
+                "metadata": {"credits": str(WEBHOOK_CREDITS), "user_id": user_id, "package_name": "starter"},
+            }
+        },
+    }).encode()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoadTest:
+    """Seeded users, their tokens, and the requests each scenario sends."""
+
+    def __init__(self, run_id: str, user_count: int):
+        self.run_id = run_id
+        self.user_count = user_count
+        self.users: list[tuple[str, dict]] = []  # (user id, auth headers)
+        self.counter = itertools.count()
+
+    @property
+    def session_prefix(self) -> str:
+        return f"cs_load_{self.run_id}_"
+
+    async def seed(self):
+        """Create the users and their balances in two statements."""
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "email": f"load-{self.run_id}-{i}@example.com",
+                "name": "Load Test User",
+                "google_id": f"load-{self.run_id}-{i}",
+            }
+            for i in range(self.user_count)
+        ]
+        async with async_session() as db:
+            await db.execute(insert(User), rows)
+            await db.execute(insert(UserCredit), [{"user_id": row["id"], "balance": SEED_BALANCE} for row in rows])
+            await db.commit()
+        for row in rows:
+            token = create_access_token(str(row["id"]), row["email"])
+            self.users.append((str(row["id"]), {"Authorization": f"Bearer {token}"}))
+
+    async def cleanup(self):
+        """Remove everything the run created."""
+        user_ids = [uuid.UUID(user_id) for user_id, _ in self.users]
+        async with async_session() as db:
+            await db.execute(delete(Payment).where(Payment.stripe_session_id.startswith(self.session_prefix)))
+            for model in (CreditHold, CreditTransaction, CreditDailyRollup, UserCredit):
+                await db.execute(delete(model).where(model.user_id.in_(user_ids)))
+            await db.execute(delete(User).where(User.id.in_(user_ids)))
+            await db.commit()
+
+    def next_request(self, scenario: str) -> tuple[str, str, dict]:
+        """Method, path and httpx keyword arguments for the scenario's next request."""
+        n = next(self.counter)
+        user_id, auth = self.users[n % len(self.users)]
+        if scenario == "balance":
+            return "GET", "/credits/balance", {"headers": auth}
+        if scenario == "me":
+            return "GET", "/users/me", {"headers": auth}
+        if scenario in ("summarize", "analyze"):
+            text = TEXT.format(n=f"{self.run_id}-{n}")
+            return "POST", f"/credits/{scenario}", {"headers": auth, "json": {"text": text}}
+        if scenario == "webhook":
+            payload = checkout_event(f"{self.session_prefix}{n}", user_id)
+            headers = {
+                "stripe-signature": sign(payload, settings.STRIPE_WEBHOOK_SECRET),
+                "content-type": "application/json",
+            }
+            return "POST", "/payments/webhook", {"content": payload, "headers": headers}
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(client: httpx.AsyncClient, load: LoadTest, scenario: str, concurrency: int, duration: float, warmup: float) -> dict:
+    """Drive one scenario with `concurrency` workers; only requests after the warmup count."""
+    latencies = []
+    statuses: dict[str, int] = {}
+    recording = False
+
+    async def worker(deadline: float):
+        while time.perf_counter() < deadline:
+            method, path, kwargs = load.next_request(scenario)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                key = str(response.status_code)
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            if recording:
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[key] = statuses.get(key, 0) + 1
+
+    if warmup > 0:
+        await asyncio.gather(*(worker(time.perf_counter() + warmup) for _ in range(concurrency)))
+
+    recording = True
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies)
+    ok = sum(count for key, count in statuses.items() if key.startswith("2"))
+    rate_limited = statuses.get("429", 0)
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "ok": ok,
+        "rate_limited": rate_limited,
+        "errors": total - ok - rate_limited,
+        "statuses": statuses,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of each scenario against the baseline, as messages."""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: {current['rps']} req/s, baseline {base['rps']} req/s")
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] is None or base[key] is None:
+                continue
+            if current[key] > base[key] * (1 + tolerance) + LATENCY_SLACK_MS:
+                regressions.append(f"{scenario}: {key} {current[key]} ms, baseline {base[key]} ms")
+        if current["errors"] and not base["errors"]:
+            regressions.append(f"{scenario}: {current['errors']} errors, baseline had none")
+    return regressions
+
+
+@asynccontextmanager
+async def http_client(url: str | None, concurrency: int):
+    """A client for the running server at `url`, or for the app in-process."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            yield client
+        return
+
+    from accessai.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=30) as client:
+            yield client
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="HTTP load test for the API hot paths")
+    parser.add_argument("--url", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight (default: 50)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario (default: 10)")
+    parser.add_argument("--warmup", type=float, default=1, help="Unrecorded seconds before each scenario (default: 1)")
+    parser.add_argument("--users", type=int, default=200, help="Users to seed (default: 200)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression as a fraction (default: 0.15)")
+    args = parser.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline")
+    if args.url and "webhook" in args.scenarios and not settings.STRIPE_WEBHOOK_SECRET:
+        parser.error("the webhook scenario needs the server's STRIPE_WEBHOOK_SECRET with --url")
+    return args
+
+
+async def main():
+    args = parse_args()
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        # In-process only (checked in parse_args): the app verifies with the same settings
+        settings.STRIPE_WEBHOOK_SECRET = PLACEHOLDER_WEBHOOK_SECRET
+    load = LoadTest(uuid.uuid4().hex[:8], args.users)
+    target = args.url or "in-process"
+
+    print(f"Target {target}: {args.concurrency} concurrent, {args.duration:g}s per scenario, {args.users} users")
+    print("-" * 50)
+
+    scenarios = {}
+    try:
+        await load.seed()
+        async with http_client(args.url, args.concurrency) as client:
+            for scenario in args.scenarios:
+                result = await run_scenario(client, load, scenario, args.concurrency, args.duration, args.warmup)
+                scenarios[scenario] = result
+                print(
+                    f"{scenario:<10} {result['rps']:>8.1f} req/s   "
+                    f"p50 {result['p50_ms']} ms   p95 {result['p95_ms']} ms   p99 {result['p99_ms']} ms   "
+                    f"errors {result['errors']}   rate limited {result['rate_limited']}"
+                )
+    finally:
+        await load.cleanup()
+        await engine.dispose()
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "target": target,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "users": args.users,
+        "scenarios": scenarios,
+    }
+    print("-" * 50)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Regressed against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
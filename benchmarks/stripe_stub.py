@@ -0,0 +1,145 @@
+"""
+Local stand-in for the Stripe API, for benchmarks and manual testing.
+Implements the endpoints the app calls (account, price lookup/creation and
+checkout sessions) with configurable latency and failure rate, and honours
+Idempotency-Key like Stripe does.
+
+Usage:
+    python -m benchmarks.stripe_stub [--port 12111] [--latency-ms 50] [--error-rate 0.1]
+
+Then start the app with STRIPE_API_BASE=http://127.0.0.1:12111 and any
+STRIPE_SECRET_KEY. In-process, create_stub_app() can be served through
+httpx.ASGITransport instead.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from urllib.parse import parse_qsl
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def unflatten(pairs: list) -> dict:
+    """Turn Stripe form keys back into nested dicts: a[b][0]=x -> {"a": {"b": {"0": "x"}}}."""
+    result = {}
+    for key, value in pairs:
+        parts = key.replace("]", "").split("[")
+        node = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return result
+
+
+def create_stub_app(latency_ms: float = 0, error_rate: float = 0) -> FastAPI:
+    """
+    Build the stub. latency_ms and error_rate live on app.state and can be
+    changed while it runs (e.g. to simulate an outage).
+    """
+    app = FastAPI(title="Stripe stub")
+    app.state.latency_ms = latency_ms
+    app.state.error_rate = error_rate
+    app.state.requests = 0
+    app.state.prices = {}
+    app.state.sessions = {}
+    app.state.idempotent = {}
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        app.state.requests += 1
+        if not request.headers.get("authorization", "").startswith(("Bearer ", "Basic ")):
+            return JSONResponse({"error": {"message": "No API key provided"}}, status_code=401)
+        if app.state.latency_ms:
+            await asyncio.sleep(app.state.latency_ms / 1000)
+        if random.random() < app.state.error_rate:
+            return JSONResponse({"error": {"message": "Simulated outage", "type": "api_error"}}, status_code=500)
+
+        key = request.headers.get("idempotency-key")
+        if request.method == "POST" and key:
+            cached = app.state.idempotent.get(key)
+            if cached is not None:
+                return JSONResponse(cached, headers={"idempotent-replayed": "true"})
+            response = await call_next(request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            if response.status_code == 200:
+                app.state.idempotent[key] = json.loads(body)
+            return JSONResponse(json.loads(body) if body else None, status_code=response.status_code)
+        return await call_next(request)
+
+    async def form(request: Request) -> dict:
+        return unflatten(parse_qsl((await request.body()).decode(), keep_blank_values=True))
+
+    @app.get("/v1/account")
+    async def account():
+        return {"id": "acct_stub", "object": "account", "charges_enabled": True}
+
+    @app.get("/v1/prices")
+    async def list_prices(request: Request):
+        keys = {value for name, value in request.query_params.multi_items() if name.startswith("lookup_keys")}
+        data = [p for p in app.state.prices.values() if p["lookup_key"] in keys and p["active"]]
+        return {"object": "list", "data": data, "has_more": False}
+
+    @app.post("/v1/prices")
+    async def create_price(request: Request):
+        params = await form(request)
+        lookup_key = params.get("lookup_key")
+        if any(p["lookup_key"] == lookup_key for p in app.state.prices.values()):
+            return JSONResponse(
+                {"error": {"message": f"A price with lookup key {lookup_key} already exists"}},
+                status_code=400
+            )
+        price = {
+            "id": f"price_{uuid.uuid4().hex[:24]}",
+            "object": "price",
+            "active": True,
+            "currency": params.get("currency"),
+            "unit_amount": int(params.get("unit_amount", 0)),
+            "lookup_key": lookup_key,
+            "metadata": params.get("metadata", {}),
+        }
+        app.state.prices[price["id"]] = price
+        return price
+
+    @app.post("/v1/checkout/sessions")
+    async def create_session(request: Request):
+        params = await form(request)
+        line_items = list(params.get("line_items", {}).values())
+        for item in line_items:
+            if "price" in item and item["price"] not in app.state.prices:
+                return JSONResponse({"error": {"message": f"No such price: {item['price']}"}}, status_code=400)
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "url": f"https://checkout.stripe.test/c/pay/{session_id}",
+            "mode": params.get("mode"),
+            "customer_email": params.get("customer_email"),
+            "client_reference_id": params.get("client_reference_id"),
+            "metadata": params.get("metadata", {}),
+            "created": int(time.time()),
+        }
+        app.state.sessions[session_id] = session
+        return session
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stripe_stub", description="Local Stripe API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every request")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with a 500")
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(args.latency_ms, args.error_rate), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()